@@ -0,0 +1,10 @@
+import pytest
+from pathlib import Path
+
+
+# Keep the state that 'today' saves in the user's cache directory (e.g. the completion listing) out of ~/.cache
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
@@ -0,0 +1,65 @@
+import os
+import pytest
+from pathlib import Path
+from datetime import date
+
+from today.api import ParseCache, iter_tasks, get_task
+from today.cli import parse_args, build_parser, tasks_to_tree
+
+
+class TestApi:
+    today = date(2022, 1, 5)
+
+    def write_vault(self, root: Path) -> None:
+        (root / "a.md").write_text("# A\n\n- [ ] Task A [d:1/4/2022]\n- [ ] Later [d:1/9/2022]\n")
+        (root / "b.md").write_text("# B\n\n- [ ] Task B [d:1/5/2022] [!0]\n")
+
+    def test_iter_tasks(self, tmp_path: Path) -> None:
+        self.write_vault(tmp_path)
+        assert [t.title for t in iter_tasks(tmp_path, today=self.today)] == ["Task B", "Task A"]
+        assert [t.title for t in iter_tasks(tmp_path, today=self.today, lookahead=4)] == [
+            "Task B", "Task A", "Later"
+        ]
+        assert [
+            t.title for t in iter_tasks(tmp_path, today=self.today, lookahead=None, where=lambda t: "a.md" in str(t.file_path))
+        ] == ["Task A", "Later"]
+        assert get_task(tmp_path, 1, today=self.today).title == "Task A"
+        with pytest.raises(IndexError):
+            get_task(tmp_path, 2, today=self.today)
+
+    def test_parse_cache(self, tmp_path: Path) -> None:
+        self.write_vault(tmp_path)
+        cache = ParseCache()
+        first = list(iter_tasks(tmp_path, today=self.today, cache=cache))
+        second = list(iter_tasks(tmp_path, today=self.today, cache=cache))
+        # Unchanged files aren't parsed again
+        assert all(t1 is t2 for t1, t2 in zip(first, second))
+
+        (tmp_path / "a.md").write_text("# A\n\n- [ ] Changed [d:1/4/2022]\n")
+        os.utime(tmp_path / "a.md", ns=(0, 0))
+        (tmp_path / "b.md").unlink()
+        assert [t.title for t in iter_tasks(tmp_path, today=self.today, cache=cache)] == ["Changed"]
+        assert list(cache.files.keys()) == [tmp_path / "a.md"]
+
+    def test_assignee(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text(
+            "- [ ] Ship it [d:1/5/2022] [@alice]\n    - [ ] Review [@bob]\n    - [ ] Docs\n"
+            "- [ ] Fix bug [d:1/4/2022] [@bob]\n- [ ] Nobody [d:1/5/2022]\n"
+        )
+        cache = ParseCache()
+        titles = lambda name: [t.title for t in iter_tasks(tmp_path, today=self.today, cache=cache, assignee=name)]
+        assert titles("alice") == ["Ship it"]
+        assert titles("bob") == ["Fix bug", "Ship it"]
+        assert titles("carol") == []
+        # The assignee index is built once per parsed file, and subtasks inherit the assignee
+        parsed = cache.files[tmp_path / "a.md"]
+        assert sorted(parsed.assignees) == ["alice", "bob"]
+        ship_it = parsed.assignees["alice"][0]
+        assert [t.attrs.assn_attr.assigned_to for t in ship_it.subtasks if t.attrs.assn_attr] == ["bob", "alice"]
+
+    def test_tasks_to_tree_has_no_side_effects(self, tmp_path: Path) -> None:
+        self.write_vault(tmp_path)
+        args = parse_args(build_parser(), ["--dir", str(tmp_path), "--today", "1/5/2022"])
+        tasks = list(iter_tasks(tmp_path, today=self.today))
+        tasks_to_tree(args, tasks)
+        assert [t.path for t in tasks] == [["B"], ["A"]]
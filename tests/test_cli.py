@@ -1,6 +1,32 @@
+import tracemalloc
 from pathlib import Path
 from datetime import date, timedelta
-from today.cli import build_parser, parse_args, CliArgs
+from typing import List, Tuple
+
+from rich.markdown import Markdown
+from rich.tree import Tree
+
+from today.cli import (
+    build_parser,
+    parse_args,
+    parse_task_files,
+    CliArgs,
+    iter_tasks,
+    agenda_buckets,
+    team_buckets,
+    tasks_to_tree,
+    tree_page,
+)
+
+
+# The (depth, label) of every node under [tree], in display order
+def labels(tree: Tree, depth: int = 0) -> List[Tuple[int, str]]:
+    result = []
+    for child in tree.children:
+        label = child.label.markup if isinstance(child.label, Markdown) else str(child.label)
+        result.append((depth, label))
+        result.extend(labels(child, depth + 1))
+    return result
 
 
 class TestCli:
@@ -25,3 +51,135 @@ class TestCli:
     def test_cli_argparse4(self) -> None:
         cli_args = parse_args(self.parser, ["--today", "1/2/2022", "3"])
         assert cli_args == CliArgs(task_dir=Path.cwd(), today=date(2022, 1, 2), lookahead_days=timedelta(days=0), task_id=3)
+
+    def test_agenda_buckets(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text(
+            """# Tasks
+
+- [ ] Overdue [d:1/1/2022]
+- [ ] Reminder then due [r:1/6/2022] [d:1/8/2022]
+- [ ] Subtask sets the day
+    - [ ] Subtask [d:1/7/2022]
+- [ ] Too far out [d:1/20/2022]
+- [x] Done [d:1/6/2022]
+"""
+        )
+        cli_args = parse_args(self.parser, ["--dir", str(tmp_path), "--today", "1/5/2022", "--days", "3"])
+        tasks_visible, buckets = agenda_buckets(cli_args, iter_tasks(cli_args))
+        assert [t.title for t in tasks_visible] == ["Overdue", "Subtask sets the day", "Reminder then due"]
+        assert buckets == {date(2022, 1, 5): [0], date(2022, 1, 6): [2], date(2022, 1, 7): [1]}
+
+    def test_parse_task_files_streams(self, tmp_path: Path) -> None:
+        # A large synthetic vault where almost every task is invisible
+        description = "A long task description that takes up memory " * 5
+        for f in range(100):
+            lines = ["# Project", ""]
+            for t in range(40):
+                lines += [f"- [ ] Task {t} [d:1/1/2030]", "", description, ""]
+            (tmp_path / f"project{f}.md").write_text("\n".join(lines))
+        (tmp_path / "visible.md").write_text("- [ ] Visible [d:1/1/2022]\n")
+        cli_args = parse_args(self.parser, ["--dir", str(tmp_path), "--today", "1/5/2022"])
+
+        tracemalloc.start()
+        tasks = parse_task_files(cli_args)
+        streaming_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert [t.title for t in tasks] == ["Visible"]
+
+        tracemalloc.start()
+        all_tasks = list(iter_tasks(cli_args))
+        materialized_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert len(all_tasks) == 4001
+        # Peak memory tracks the visible tasks (and one file at a time), not the whole vault
+        assert streaming_peak * 5 < materialized_peak
+
+    def test_multiple_task_dirs(self, tmp_path: Path) -> None:
+        work, home = tmp_path / "work", tmp_path / "home"
+        work.mkdir()
+        home.mkdir()
+        (work / "tasks.md").write_text("# Work\n\n- [ ] Report [d:1/3/2022]\n- [ ] Email [d:1/5/2022] [!1]\n")
+        (home / "tasks.md").write_text("# Home\n\n- [ ] Laundry [d:1/4/2022]\n- [ ] Bills [d:1/5/2022] [!0]\n")
+        cli_args = parse_args(self.parser, ["--dir", str(work), "--dir", str(home), "--today", "1/5/2022"])
+        assert cli_args.task_dirs() == (work, home)
+        tasks = parse_task_files(cli_args)
+        assert [t.title for t in tasks] == ["Bills", "Email", "Laundry", "Report"]
+        # File paths are disambiguated by the name of their task directory
+        assert [cli_args.display_path(t.file_path) for t in tasks] == [
+            "home/tasks.md", "work/tasks.md", "home/tasks.md", "work/tasks.md"
+        ]
+
+        # Task directories with the same name are told apart by their parent directories
+        (tmp_path / "x" / "notes").mkdir(parents=True)
+        (tmp_path / "y" / "notes").mkdir(parents=True)
+        (tmp_path / "x" / "notes" / "tasks.md").write_text("# Todo\n\n- [ ] X [d:1/5/2022]\n")
+        (tmp_path / "y" / "notes" / "tasks.md").write_text("# Todo\n\n- [ ] Y [d:1/5/2022]\n")
+        cli_args = parse_args(
+            self.parser, ["--dir", str(tmp_path / "x" / "notes"), "--dir", str(tmp_path / "y" / "notes"), "--today", "1/5/2022"]
+        )
+        tasks = parse_task_files(cli_args)
+        assert [cli_args.display_path(t.file_path) for t in tasks] == ["x/notes/tasks.md", "y/notes/tasks.md"]
+        assert len(labels(tasks_to_tree(cli_args, tasks))) == 4
+
+        # A task directory inside another one is part of it, its tasks are only listed once
+        (tmp_path / "work" / "inner").mkdir()
+        (tmp_path / "work" / "inner" / "tasks.md").write_text("- [ ] Inner [d:1/5/2022]\n")
+        for dirs in [[work, work / "inner"], [work / "inner", work]]:
+            cli_args = parse_args(self.parser, [*[a for d in dirs for a in ["--dir", str(d)]], "--today", "1/5/2022"])
+            assert cli_args.task_dirs() == (work,)
+            assert [t.title for t in parse_task_files(cli_args)].count("Inner") == 1
+
+        config = tmp_path / "roots"
+        config.write_text("# My task directories\nwork\n\nhome\n")
+        assert parse_args(self.parser, ["--config", str(config)]).task_dirs() == (work, home)
+
+    def test_team_buckets(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text(
+            "- [ ] Ship it [d:t] [@alice]\n    - [ ] Review [@bob]\n"
+            "- [ ] Fix bug [d:t] [@bob]\n- [ ] Nobody [d:t]\n"
+        )
+        args = parse_args(build_parser(), ["--dir", str(tmp_path)])
+        tasks = parse_task_files(args)
+        assert [t.title for t in tasks] == ["Ship it", "Fix bug", "Nobody"]
+        assert team_buckets(tasks) == {"alice": [0], "bob": [0, 1], None: [2]}
+
+        args = parse_args(build_parser(), ["--dir", str(tmp_path), "--assignee", "bob"])
+        assert [t.title for t in parse_task_files(args)] == ["Ship it", "Fix bug"]
+        args = parse_args(build_parser(), ["--dir", str(tmp_path), "--assignee", "bob", "--index"])
+        assert [t.title for t in parse_task_files(args)] == ["Ship it", "Fix bug"]
+
+    def test_tree_pages(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text(
+            """# Project A
+
+- [ ] Priority [d:1/1/2022] [!1]
+- [ ] A1 [d:1/1/2022]
+    - [ ] A1 subtask [d:1/1/2022]
+    - [ ] Hidden subtask [d:2/1/2022]
+
+## Subheading
+
+- [ ] A2 [d:1/1/2022]
+
+# Project B
+
+"""
+            + "".join(f"- [ ] B{i} [d:1/1/2022]\n" for i in range(5))
+        )
+        args = parse_args(self.parser, ["--dir", str(tmp_path), "--today", "1/2/2022"])
+        tasks = parse_task_files(args)
+
+        full = labels(tasks_to_tree(args, tasks))
+        assert len(full) == 13
+        # The pages put together are the whole tree, with the ancestors of the first row of each page repeated
+        rows: List[Tuple[int, str]] = []
+        for start in range(0, 13, 4):
+            page = tree_page(args, tasks, start, 4)
+            assert (page.start, page.count) == (start, min(4, 13 - start))
+            page_labels = labels(page.tree)
+            first_depth = len(page_labels) - page.count
+            assert page_labels[:first_depth] == [full[rows.index(label)] for label in page_labels[:first_depth]]
+            rows.extend(page_labels[first_depth:])
+            assert sum(1 for _ in page.rest) == 13 - start - page.count
+        assert rows == full
+        assert tree_page(args, tasks, 13, 4).count == 0
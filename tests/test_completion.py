@@ -0,0 +1,45 @@
+import pytest
+from pathlib import Path
+from datetime import date
+
+from today import completion
+from today.scripts import today
+
+
+class TestCompletion:
+    def write_vault(self, root: Path) -> None:
+        (root / "a.md").write_text("# A\n\n## Sub\n\n- [ ] Task A [d:1/4/2022]\n- [ ] Later [d:1/9/2022]\n")
+        (root / "b.md").write_text("- [ ] Task B [d:1/5/2022] [!0]\n")
+
+    def test_candidates(self, tmp_path: Path) -> None:
+        self.write_vault(tmp_path)
+        words = ["--dir", str(tmp_path), "--today", "1/5/2022"]
+        # Without a listing snapshot, the task files are parsed (and the snapshot is saved)
+        assert completion.candidates(words + [""]) == ["0\tTask B", "1\tTask A (A / Sub)"]
+        assert completion.listing_path([tmp_path]).exists()
+        assert completion.candidates(words + ["1"]) == ["1\tTask A (A / Sub)"]
+        assert completion.candidates(["--days=4"] + words + [""])[2] == "2\tLater (A / Sub)"
+
+        # No task ids for options, their values, or after a task id (or subcommand)
+        assert completion.candidates(words + ["--d"]) == []
+        assert completion.candidates(words + ["--dir", ""]) == []
+        assert completion.candidates(words + ["0", ""]) == []
+        assert completion.candidates(["agenda"] + words + [""]) == []
+
+    def test_listing_snapshot(self, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+        self.write_vault(tmp_path)
+        with pytest.raises(SystemExit):
+            today.run(["--dir", str(tmp_path), "--today", "1/5/2022"])
+        capsys.readouterr()
+        # The listing is kept in the user's cache directory, 'today' doesn't write to the task directory
+        assert not (tmp_path / ".today").exists()
+        listing = completion.read_listing([tmp_path], date(2022, 1, 5), 0, None, None)
+        assert listing == [("Task B", ""), ("Task A", "A / Sub")]
+        # The snapshot is only used with the same date and options
+        assert completion.read_listing([tmp_path], date(2022, 1, 6), 0, None, None) is None
+        assert completion.read_listing([tmp_path], date(2022, 1, 5), 3, None, None) is None
+
+        # Candidates come from the snapshot, not the task files
+        (tmp_path / "b.md").unlink()
+        words = ["--dir", str(tmp_path), "--today", "1/5/2022", ""]
+        assert completion.candidates(words)[0] == "0\tTask B"
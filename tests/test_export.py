@@ -0,0 +1,92 @@
+import os
+import shutil
+from pathlib import Path
+from datetime import date
+
+from today.cli import build_parser, parse_args
+from today.export import export_ics, ics_line
+
+
+class TestExport:
+    today = date(2022, 1, 5)
+
+    def export(self, output: Path, *task_dirs: Path):
+        args = parse_args(build_parser(), [*[a for d in task_dirs for a in ["--dir", str(d)]], "--today", "1/5/2022"])
+        return export_ics(args.task_dirs(), self.today, output, args.display_path, args.file_identity)
+
+    def test_export_ics(self, tmp_path: Path) -> None:
+        vault = tmp_path / "vault"
+        vault.mkdir()
+        (vault / "a.md").write_text(
+            "# Work\n\n- [ ] Report, final [d:1/7/2022] [r:1/6/2022] [!0]\n- [ ] Someday\n- [x] Done [d:1/1/2022]\n"
+        )
+        (vault / "b.md").write_text("- [ ] Call [r:t]\n")
+        output = tmp_path / "tasks.ics"
+        result = self.export(output, vault)
+        assert (result.files_rendered, result.files_cached, result.written) == (2, 0, True)
+        ics = output.read_bytes().decode()
+        assert ics.startswith("BEGIN:VCALENDAR\r\n") and ics.endswith("END:VCALENDAR\r\n")
+        assert ics.count("BEGIN:VTODO") == 2
+        assert ics.count("BEGIN:VEVENT") == 2
+        assert "SUMMARY:Report\\, final\r\n" in ics
+        assert "DUE;VALUE=DATE:20220107\r\n" in ics
+        assert "DTSTART;VALUE=DATE:20220105\r\n" in ics
+        assert "STATUS:COMPLETED\r\n" in ics
+
+        # An untouched vault leaves the output as it is
+        stat = output.stat()
+        result = self.export(output, vault)
+        assert (result.files_rendered, result.files_cached, result.written) == (0, 2, False)
+        assert output.stat().st_mtime_ns == stat.st_mtime_ns
+
+        # Touching a file re-renders only its fragment, the output doesn't change
+        os.utime(vault / "b.md", ns=(0, 0))
+        result = self.export(output, vault)
+        assert (result.files_rendered, result.files_cached, result.written) == (1, 1, False)
+        assert output.read_bytes().decode() == ics
+
+        # Stable UIDs: editing a task keeps the UIDs of the others
+        uids = [line for line in ics.split("\r\n") if line.startswith("UID:")]
+        (vault / "b.md").write_text("- [ ] Call [r:1/8/2022]\n")
+        result = self.export(output, vault)
+        assert result.written
+        new_ics = output.read_bytes().decode()
+        assert [line for line in new_ics.split("\r\n") if line.startswith("UID:")] == uids
+        assert "DTSTART;VALUE=DATE:20220108\r\n" in new_ics
+
+        # The output is rewritten if it was changed by someone else
+        output.write_text("")
+        assert self.export(output, vault).written
+        assert output.read_bytes().decode() == new_ics
+
+    def test_uids_across_task_dirs(self, tmp_path: Path) -> None:
+        work, home = tmp_path / "work", tmp_path / "home"
+        work.mkdir()
+        home.mkdir()
+        (work / "tasks.md").write_text("- [ ] Report [d:1/7/2022]\n")
+        (home / "tasks.md").write_text("- [ ] Laundry [d:1/7/2022]\n")
+        output = tmp_path / "tasks.ics"
+        self.export(output, work)
+        uids = [line for line in output.read_text().splitlines() if line.startswith("UID:")]
+        # Adding a task directory changes the displayed paths, but not the UIDs
+        self.export(output, work, home)
+        new_uids = [line for line in output.read_text().splitlines() if line.startswith("UID:")]
+        assert len(new_uids) == 2 and new_uids[0] == uids[0]
+        assert "DESCRIPTION:work/tasks.md:1" in output.read_text()
+        # Neither does moving the task directory (or exporting it on another machine)
+        shutil.copytree(work, tmp_path / "elsewhere" / "work")
+        self.export(output, tmp_path / "elsewhere" / "work")
+        assert [line for line in output.read_text().splitlines() if line.startswith("UID:")] == uids
+
+    def test_duplicate_titles(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text("# Work\n\n- [ ] Review PRs [d:1/7/2022]\n- [ ] Review PRs [d:1/8/2022]\n")
+        output = tmp_path / "tasks.ics"
+        self.export(output, tmp_path)
+        uids = [line for line in output.read_text().splitlines() if line.startswith("UID:")]
+        assert len(uids) == 2 and len(set(uids)) == 2
+
+    def test_ics_line_folding(self) -> None:
+        folded = ics_line("SUMMARY:" + "é" * 100)
+        lines = folded.encode().split(b"\r\n")
+        assert all(len(line) <= 75 for line in lines)
+        assert folded.replace("\r\n ", "") == "SUMMARY:" + "é" * 100 + "\r\n"
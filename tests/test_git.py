@@ -0,0 +1,82 @@
+import shutil
+import subprocess
+import pytest
+from pathlib import Path
+from datetime import date
+
+from today.api import ParseCache, iter_tasks
+from rich.console import Console
+
+from today.cli import parse_args, build_parser, parse_task_files
+from today.scripts.today import print_tasks
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=today", "-c", "user.email=today@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+class TestGit:
+    today = date(2022, 1, 5)
+
+    def make_repo(self, repo: Path) -> Path:
+        repo.mkdir(exist_ok=True)
+        git(repo, "init", "-q")
+        vault = repo / "tasks"
+        (vault / "sub").mkdir(parents=True)
+        (repo / "outside.md").write_text("- [ ] Not a task file of the vault [d:t]\n")
+        (vault / "a.md").write_text("# A\n\n- [ ] Old task [d:t]\n")
+        (vault / "sub" / "b.md").write_text("# B\n\n- [ ] Unchanged task [d:t]\n")
+        git(repo, "add", ".")
+        git(repo, "commit", "-q", "-m", "first")
+        (vault / "a.md").write_text("# A\n\n- [ ] New task [d:t]\n")
+        git(repo, "commit", "-q", "-a", "-m", "second")
+        # Uncommitted changes aren't visible at any revision
+        (vault / "a.md").write_text("# A\n\n- [ ] Uncommitted task [d:t]\n")
+        return vault
+
+    def test_iter_tasks_at(self, tmp_path: Path) -> None:
+        vault = self.make_repo(tmp_path)
+        titles = lambda rev: [t.title for t in iter_tasks(vault, today=self.today, rev=rev)]
+        assert titles(None) == ["Uncommitted task", "Unchanged task"]
+        assert titles("HEAD") == ["New task", "Unchanged task"]
+        assert titles("HEAD~1") == ["Old task", "Unchanged task"]
+        tasks = list(iter_tasks(vault, today=self.today, rev="HEAD~1"))
+        assert [t.file_path for t in tasks] == [vault / "a.md", vault / "sub" / "b.md"]
+        with pytest.raises(ValueError):
+            titles("no-such-revision")
+
+    def test_blob_cache(self, tmp_path: Path) -> None:
+        vault = self.make_repo(tmp_path)
+        cache = ParseCache()
+        old = list(iter_tasks(vault, today=self.today, cache=cache, rev="HEAD~1"))
+        new = list(iter_tasks(vault, today=self.today, cache=cache, rev="HEAD"))
+        # The file that didn't change between the revisions is only parsed once
+        assert old[1] is new[1]
+        assert old[0] is not new[0]
+        assert len(cache.blobs) == 3
+
+    def test_cli_at(self, tmp_path: Path) -> None:
+        vault = self.make_repo(tmp_path)
+        args = parse_args(build_parser(), ["--dir", str(vault), "--today", "1/5/2022", "--at", "HEAD~1"])
+        assert [t.title for t in parse_task_files(args)] == ["Old task", "Unchanged task"]
+
+    def test_bad_revision(self, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+        vault = self.make_repo(tmp_path / "repo")
+        other = tmp_path / "other"
+        other.mkdir()
+        (other / "c.md").write_text("- [ ] Not in git [d:t]\n")
+        for task_dirs in [[vault], [vault, other]]:
+            dir_args = [arg for d in task_dirs for arg in ["--dir", str(d)]]
+            args = parse_args(build_parser(), [*dir_args, "--today", "1/5/2022", "--at", "nosuchrev"])
+            assert print_tasks(args, Console()) == 1
+            assert "nosuchrev" in capsys.readouterr().out
+        # Outside of a git repository
+        args = parse_args(build_parser(), ["--dir", str(other), "--at", "HEAD"])
+        assert print_tasks(args, Console()) == 1
+        assert "not a git repository" in capsys.readouterr().out
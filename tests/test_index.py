@@ -0,0 +1,70 @@
+from pathlib import Path
+from datetime import date
+
+from typing import List
+
+from today.index import connect, sync_index, visible_tasks, rebuild_index, file_diagnostics
+from today.parser import Diagnostic, parse_task_file
+
+
+class TestIndex:
+    today = date(2022, 1, 5)
+    tasks_md = """# Tasks
+
+- [ ] Task 1 [d:1/4/2022] [!1] [@alice] [e:30m]
+
+Description
+
+- [ ] Task 2 [r:1/10/2022]
+- [x] Task 3 [d:1/1/2022]
+
+## Subheading
+
+- [ ] Task 4
+    - [ ] Subtask [d:1/5/2022]
+        - [x] Subsubtask
+"""
+
+    def test_schema_version(self, tmp_path: Path) -> None:
+        # An index with an older schema is dropped and rebuilt from the task files
+        (tmp_path / "tasks.md").write_text(self.tasks_md)
+        conn = connect(tmp_path)
+        conn.execute("ALTER TABLE tasks DROP COLUMN estimate_minutes")
+        conn.execute("PRAGMA user_version = 0")
+        conn.close()
+        conn = connect(tmp_path)
+        assert sync_index(conn, tmp_path, self.today) == 1
+        assert visible_tasks(conn, tmp_path, self.today)[0].attrs.estimate_attr is not None
+
+    def test_index_matches_parser(self, tmp_path: Path) -> None:
+        file = tmp_path / "tasks.md"
+        file.write_text(self.tasks_md)
+        conn = connect(tmp_path)
+        assert sync_index(conn, tmp_path, self.today) == 1
+        diagnostics: List[Diagnostic] = []
+        expected = [
+            t for t in parse_task_file(file, self.today, diagnostics=diagnostics) if t.is_displayed(self.today)
+        ]
+        assert visible_tasks(conn, tmp_path, self.today) == expected
+        assert [t.title for t in expected] == ["Task 1", "Task 4"]
+        # Task 4 has no dates but its subtask does
+        assert file_diagnostics(conn, tmp_path) == diagnostics
+        assert [d.line_number for d in diagnostics] == [12]
+        conn.close()
+
+    def test_incremental_sync(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text(self.tasks_md)
+        (tmp_path / "b.md").write_text("- [ ] Other task [d:t]\n")
+        conn = connect(tmp_path)
+        assert sync_index(conn, tmp_path, self.today) == 2
+        # Nothing changed
+        assert sync_index(conn, tmp_path, self.today) == 0
+        # Only the modified file is re-parsed, deleted files are dropped
+        (tmp_path / "b.md").write_text("- [ ] Changed task [d:t]\n")
+        (tmp_path / "a.md").unlink()
+        assert sync_index(conn, tmp_path, self.today) == 1
+        assert [t.title for t in visible_tasks(conn, tmp_path, self.today)] == ["Changed task"]
+        # Files are re-parsed on a new day since [d:t] depends on today's date
+        assert sync_index(conn, tmp_path, date(2022, 1, 6)) == 1
+        conn.close()
+        assert rebuild_index(tmp_path, self.today) == 1
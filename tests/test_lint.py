@@ -0,0 +1,31 @@
+import pytest
+from pathlib import Path
+from datetime import date
+
+from today import lint
+
+
+class TestLint:
+    today = date(2022, 1, 5)
+
+    def test_lint_cache(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        # Check the files in worker processes even though there are only a few of them
+        monkeypatch.setattr(lint, "parallel_threshold", 2)
+        (tmp_path / "good.md").write_text("# Tasks\n\n- [ ] Task [d:t]\n")
+        (tmp_path / "bad.md").write_text("# Tasks\n### Too deep\n- [ ] Task [d:2/30]\n")
+        (tmp_path / "other.md").write_text("- [ ] Task [!high]\n")
+
+        result = lint.lint(tmp_path, self.today)
+        assert [(d.file_path, d.line_number) for d in result.diagnostics] == [
+            (tmp_path / "bad.md", 2),
+            (tmp_path / "bad.md", 3),
+            (tmp_path / "other.md", 1),
+        ]
+        assert (result.files_checked, result.files_cached) == (3, 0)
+
+        # Only changed files are checked again
+        (tmp_path / "other.md").write_text("- [ ] Task [!1]\n")
+        (tmp_path / "good.md").unlink()
+        result = lint.lint(tmp_path, self.today)
+        assert [d.line_number for d in result.diagnostics] == [2, 3]
+        assert (result.files_checked, result.files_cached) == (1, 1)
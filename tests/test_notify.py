@@ -0,0 +1,39 @@
+import os
+import signal
+from pathlib import Path
+
+from today.notify import I3StatusNotifier
+
+
+class TestNotify:
+    def test_i3status_pid_lookup(self, tmp_path: Path) -> None:
+        proc = tmp_path / "proc"
+        for pid, comm in [(10, "bash"), (20, "i3status"), (30, "i3status")]:
+            (proc / str(pid)).mkdir(parents=True)
+            (proc / str(pid) / "comm").write_text(comm + "\n")
+        notifier = I3StatusNotifier(tmp_path / "task", proc_dir=proc)
+        assert sorted(notifier.find_pids()) == [20, 30]
+        assert sorted(notifier.pids() or []) == [20, 30]
+        assert notifier.pid_cache.exists()
+
+        # A stale cached PID (i3status restarted) triggers a fresh lookup
+        (proc / "20" / "comm").write_text("vim\n")
+        assert notifier.pids() == [30]
+        assert I3StatusNotifier(tmp_path / "task", proc_dir=tmp_path / "missing").pids() is None
+
+    def test_notify_writes_atomically(self, tmp_path: Path) -> None:
+        # Point the notifier at this process so the refresh signal is observable
+        proc = tmp_path / "proc"
+        (proc / str(os.getpid())).mkdir(parents=True)
+        (proc / str(os.getpid()) / "comm").write_text("i3status\n")
+        received = []
+        previous = signal.signal(signal.SIGUSR1, lambda signum, frame: received.append(signum))
+        try:
+            I3StatusNotifier(tmp_path / "task", proc_dir=proc).notify("snippet")
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+        assert (tmp_path / "task").read_text() == "snippet"
+        assert received == [signal.SIGUSR1]
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "proc", "task", "task.i3status.pid", "task.lock"
+        ]
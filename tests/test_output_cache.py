@@ -0,0 +1,57 @@
+import pytest
+from pathlib import Path
+from datetime import date
+
+from today import output_cache
+from today.scripts import today
+
+
+class TestOutputCache:
+    today = date(2022, 1, 5)
+    options = ["80", "truecolor"]
+
+    def test_fingerprint(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text("- [ ] Task [d:t]\n")
+        key = output_cache.fingerprint([tmp_path], self.today, self.options)
+        path = output_cache.output_path(tmp_path, self.options)
+        output_cache.store(path, key, "output\n")
+        assert output_cache.load(path, key) == "output\n"
+        assert output_cache.fingerprint([tmp_path], self.today, self.options) == key
+
+        # Invalidated at midnight, and by different options
+        assert output_cache.fingerprint([tmp_path], date(2022, 1, 6), self.options) != key
+        assert output_cache.fingerprint([tmp_path], self.today, ["100", "truecolor"]) != key
+        assert output_cache.output_path(tmp_path, ["100", "truecolor"]) != path
+
+        # Invalidated when a task file is modified, created or deleted
+        (tmp_path / "a.md").write_text("- [ ] Edited [d:t]\n")
+        modified = output_cache.fingerprint([tmp_path], self.today, self.options)
+        (tmp_path / "b.md").write_text("- [ ] Task [d:t]\n")
+        created = output_cache.fingerprint([tmp_path], self.today, self.options)
+        (tmp_path / "b.md").unlink()
+        deleted = output_cache.fingerprint([tmp_path], self.today, self.options)
+        assert len({key, modified, created}) == 3
+        assert deleted == modified
+        assert output_cache.load(path, deleted) is None
+
+    def test_cached_run(self, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+        (tmp_path / "a.md").write_text("# Tasks\n\n- [ ] Task [d:t]\n")
+        args = ["--dir", str(tmp_path), "--today", "1/5/2022", "--cache-output"]
+        with pytest.raises(SystemExit):
+            today.run(args)
+        first = capsys.readouterr().out
+        assert "Task" in first
+        cached = list((tmp_path / ".today" / "output").iterdir())
+        assert len(cached) == 1
+
+        # The output is served from the cache, even though the cache file says something else
+        key, _ = cached[0].read_text().split("\n", 1)
+        cached[0].write_text(f"{key}\nfrom the cache\n")
+        with pytest.raises(SystemExit):
+            today.run(args)
+        assert capsys.readouterr().out == "from the cache\n"
+
+        (tmp_path / "b.md").write_text("# More\n\n- [ ] Another task [d:t]\n")
+        with pytest.raises(SystemExit):
+            today.run(args)
+        assert "Another task" in capsys.readouterr().out
@@ -1,5 +1,6 @@
 import pytest
 from datetime import date
+from typing import List
 
 from today.task import DateAttribute, Task, TaskAttributes, date_relative_to_today
 from today.parser import (
@@ -8,7 +9,9 @@ from today.parser import (
     parse_markdown,
     extract_task_attrs,
     parse_task_title,
+    parse_duration,
     Heading,
+    Diagnostic,
 )
 
 
@@ -82,6 +85,20 @@ class TestParser:
         assert attrs3.assn_attr is None
         assert title3 == "things #tag"
 
+    def test_estimate_attr(self) -> None:
+        attrs, title = extract_task_attrs("Write the report [e:1h30m] [d:t]", today=self.today)
+        assert attrs.estimate_attr
+        assert attrs.estimate_attr.minutes == 90
+        assert title == "Write the report"
+        assert [parse_duration(d) for d in ["2h", "45m", "1.5h", "0m"]] == [120, 45, 90, 0]
+        for bad in ["", "2", "h", "1m2h", "2 hours"]:
+            with pytest.raises(ValueError):
+                parse_duration(bad)
+        errors: List[str] = []
+        attrs, _ = extract_task_attrs("Task [e:soon]", today=self.today, errors=errors)
+        assert attrs.estimate_attr is None
+        assert len(errors) == 1
+
     def test_parse_task_title(self) -> None:
         assert parse_task_title(
             "[d:1/1/2022] task *title* #tag [c:2/2/2022] other [r:1/4/2022] [f:1/5/2022]",
@@ -221,3 +238,65 @@ Description
                 ],
             )
         ]
+
+    def test_nested_subtask_parsing(self) -> None:
+        subtasks = """# Tasks
+
+- [ ] Main task [d:1/10/2022]
+    - [ ] Subtask 1 [r:1/3/2022]
+        - [ ] Subsubtask 1 [d:1/8/2022]
+\t\t- [x] Subsubtask 2
+    - [ ] Subtask 2
+"""
+        result = parse_markdown(subtasks.split("\n"), date.today())
+        assert len(result) == 1
+        main = result[0]
+        assert [t.title for t in main.subtasks] == ["Subtask 1", "Subtask 2"]
+        sub1 = main.subtasks[0]
+        assert [t.title for t in sub1.subtasks] == ["Subsubtask 1", "Subsubtask 2"]
+        assert [t.line_number for t in sub1.subtasks] == [5, 6]
+        # Attributes are propagated down each level
+        assert sub1.subtasks[0].attrs.date_attr == DateAttribute(
+            due_date=date(2022, 1, 8), reminder_date=date(2022, 1, 3)
+        )
+        assert sub1.subtasks[1].attrs.date_attr == DateAttribute(
+            due_date=date(2022, 1, 10), reminder_date=date(2022, 1, 3)
+        )
+        assert sub1.subtasks[1].done
+        assert main.subtasks[1].subtasks == []
+
+    def test_parse_diagnostics(self) -> None:
+        md = """# Tasks
+### Too deep
+
+- [ ] Bad date [d:13/1/2022] [!1]
+#not-a-heading
+  - [ ] Nested subtask
+
+- [ ] Parent
+    - [ ] Subtask [d:1/1/2022]
+### Sibling of too deep
+
+- [ ] Sibling task
+#### Below sibling
+
+- [ ] Deepest task
+## Back at level 2
+
+- [ ] Level 2 task
+"""
+        with pytest.raises(ValueError):
+            parse_markdown(md.split("\n"), date(2022, 1, 1))
+        diagnostics: List[Diagnostic] = []
+        result = parse_markdown(md.split("\n"), date(2022, 1, 1), diagnostics)
+        # Parsing keeps going, skipping over the problems
+        assert [t.title for t in result] == ["Bad date", "Parent", "Sibling task", "Deepest task", "Level 2 task"]
+        assert result[0].path == ["Tasks", "Too deep"]
+        # Later headings at the same written level are siblings of the heading that was nested too deep
+        assert result[2].path == ["Tasks", "Sibling of too deep"]
+        assert result[3].path == ["Tasks", "Sibling of too deep", "Below sibling"]
+        assert result[4].path == ["Tasks", "Back at level 2"]
+        assert result[0].attrs.priority_attr is not None
+        assert result[0].attrs.date_attr.due_date is None
+        assert result[0].description == "#not-a-heading"
+        assert [d.line_number for d in diagnostics] == [2, 4, 5, 8, 10]
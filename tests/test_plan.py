@@ -0,0 +1,50 @@
+import time
+from datetime import date
+from typing import List
+
+from today.parser import parse_markdown
+from today.task import Task
+from today.plan import plan, task_estimate
+
+
+class TestPlan:
+    today = date(2022, 1, 5)
+
+    def parse(self, md: str) -> List[Task]:
+        return parse_markdown(md.split("\n"), today=self.today)
+
+    def test_plan(self) -> None:
+        tasks = self.parse(
+            "- [ ] Pri [r:1/5/2022] [!0] [e:2h]\n"
+            "- [ ] Big [d:1/1/2022] [e:4h]\n"
+            "- [ ] Medium [d:1/3/2022] [e:1.5h]\n"
+            "- [ ] Small [d:1/5/2022] [e:30m]\n"
+            "- [ ] No estimate [d:1/5/2022]\n"
+        )
+        result = plan(tasks, self.today, 6 * 60)
+        # Three smaller tasks are worth more than the big overdue one
+        assert [(i, t.title) for i, t in result.tasks] == [(0, "Pri"), (2, "Medium"), (3, "Small")]
+        assert result.minutes == 4 * 60
+        assert [i for i, _ in result.unestimated] == [4]
+        assert plan(tasks, self.today, 0).tasks == []
+
+    def test_tie_break(self) -> None:
+        # Equally valuable tasks, only one fits: the first one in the listing is picked
+        tasks = self.parse("- [ ] First [d:1/5/2022] [e:1h]\n- [ ] Second [d:1/5/2022] [e:1h]\n")
+        assert [t.title for _, t in plan(tasks, self.today, 90).tasks] == ["First"]
+
+    def test_subtask_estimates(self) -> None:
+        tasks = self.parse(
+            "- [ ] Parent [d:t]\n    - [ ] A [e:20m]\n    - [x] B [e:1h]\n    - [ ] C [e:1m]\n"
+        )
+        assert task_estimate(tasks[0]) == 21
+
+    def test_many_tasks(self) -> None:
+        md = "\n".join(
+            f"- [ ] Task {i} [d:1/{1 + i % 9}/2022] [!{i % 4}] [e:{5 + (i * 7) % 180}m]" for i in range(500)
+        )
+        tasks = self.parse(md)
+        start = time.monotonic()
+        result = plan(tasks, self.today, 8 * 60)
+        assert time.monotonic() - start < 2
+        assert 0 < result.minutes <= 8 * 60
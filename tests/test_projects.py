@@ -0,0 +1,56 @@
+import pytest
+from pathlib import Path
+from datetime import date
+from typing import List
+
+from today import projects
+
+
+class TestProjects:
+    today = date(2022, 1, 5)
+
+    def test_rollup(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text(
+            "# Work\n\n## Deep\n\n- [ ] Late [d:1/1/2022]\n- [ ] Soon [d:1/11/2022]\n"
+            "- [x] Done [f:1/2/2022]\n- [x] Old [f:11/1/2021]\n\n# Home\n\n- [ ] Later [d:3/1/2022]\n"
+        )
+        (tmp_path / "b.md").write_text("- [ ] No heading\n")
+        rows = projects.rollup(projects.project_histograms(tmp_path, self.today), self.today)
+        assert [(r.file, r.heading) for r in rows] == [
+            ("a.md", None), ("a.md", "Work"), ("a.md", "Home"), ("b.md", None)
+        ]
+        assert rows[0].counts == projects.ProjectCounts(3, 1, 1, 1)
+        assert rows[1].counts == projects.ProjectCounts(2, 1, 1, 1)
+        assert rows[3].counts == projects.ProjectCounts(1, 0, 0, 0)
+
+        # The cached histograms give the counts for other dates
+        later = date(2022, 2, 1)
+        rows = projects.rollup(projects.project_histograms(tmp_path, later), later)
+        assert rows[0].counts == projects.ProjectCounts(3, 2, 0, 0)
+
+    def test_cache(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        parsed: List[str] = []
+        parse_task_file = projects.parse_task_file
+
+        def counting_parse(path: Path, *args, **kwargs):
+            parsed.append(path.name)
+            return parse_task_file(path, *args, **kwargs)
+
+        monkeypatch.setattr(projects, "parse_task_file", counting_parse)
+        (tmp_path / "a.md").write_text("- [ ] Task [d:1/4/2022]\n")
+        (tmp_path / "b.md").write_text("- [ ] Task [d:t]\n")
+        projects.project_histograms(tmp_path, self.today)
+        assert sorted(parsed) == ["a.md", "b.md"]
+
+        # Only changed files (and files with [d:t] on another day) are parsed again
+        parsed.clear()
+        projects.project_histograms(tmp_path, self.today)
+        assert parsed == []
+        projects.project_histograms(tmp_path, date(2022, 1, 6))
+        assert parsed == ["b.md"]
+        (tmp_path / "a.md").write_text("- [ ] Edited task [d:1/4/2022]\n")
+        (tmp_path / "b.md").unlink()
+        parsed.clear()
+        histograms = projects.project_histograms(tmp_path, date(2022, 1, 6))
+        assert parsed == ["a.md"]
+        assert list(histograms) == ["a.md"]
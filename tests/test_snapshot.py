@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+from datetime import date
+
+from typing import List
+
+from today.snapshot import build_snapshot, snapshot_path, visible_tasks
+from today.parser import Diagnostic, parse_task_file
+
+
+class TestSnapshot:
+    today = date(2022, 1, 5)
+    tasks_md = """# Tasks
+
+- [ ] Task 1 [d:1/4/2022] [!1] [@alice] [e:30m]
+
+Description
+
+- [ ] Task 2 [r:1/10/2022]
+- [x] Task 3 [d:1/1/2022]
+
+## Subheading
+
+- [ ] Task 4 [@bob]
+    - [ ] Subtask [d:1/5/2022]
+        - [x] Subsubtask
+"""
+
+    def parsed(self, file: Path, date_filter: date, diagnostics: List[Diagnostic]):
+        return [t for t in parse_task_file(file, self.today, diagnostics=diagnostics) if t.is_displayed(date_filter)]
+
+    def test_no_snapshot(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text(self.tasks_md)
+        assert visible_tasks(tmp_path, self.today, self.today, None, []) is None
+
+    def test_snapshot_matches_parser(self, tmp_path: Path) -> None:
+        file = tmp_path / "tasks.md"
+        file.write_text(self.tasks_md)
+        assert build_snapshot(tmp_path, self.today) == (1, 6)
+        assert snapshot_path(tmp_path).exists()
+        for date_filter in [self.today, date(2022, 1, 10)]:
+            expected_diagnostics: List[Diagnostic] = []
+            expected = self.parsed(file, date_filter, expected_diagnostics)
+            diagnostics: List[Diagnostic] = []
+            assert visible_tasks(tmp_path, self.today, date_filter, None, diagnostics) == expected
+            assert diagnostics == expected_diagnostics
+        tasks = visible_tasks(tmp_path, self.today, self.today, None, [])
+        assert tasks is not None
+        assert [t.title for t in tasks] == ["Task 1", "Task 4"]
+
+    def test_assignee(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text(self.tasks_md)
+        build_snapshot(tmp_path, self.today)
+        def titles(assignee: str) -> List[str]:
+            tasks = visible_tasks(tmp_path, self.today, self.today, assignee, [])
+            assert tasks is not None
+            return [t.title for t in tasks]
+
+        assert titles("alice") == ["Task 1"]
+        # The subtask inherits the assignee of Task 4
+        assert titles("bob") == ["Task 4"]
+        assert titles("carol") == []
+
+    def test_changed_files(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text(self.tasks_md)
+        (tmp_path / "b.md").write_text("- [ ] Other task [d:1/3/2022]\n")
+        (tmp_path / "c.md").write_text("- [ ] Deleted task [d:1/3/2022]\n")
+        build_snapshot(tmp_path, self.today)
+
+        # Modified, new and deleted files are read from the task files
+        (tmp_path / "b.md").write_text("- [ ] Modified task [d:1/3/2022]\n")
+        stat = (tmp_path / "b.md").stat()
+        os.utime(tmp_path / "b.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        (tmp_path / "d.md").write_text("- [ ] New task [d:1/3/2022]\n")
+        (tmp_path / "c.md").unlink()
+        tasks = visible_tasks(tmp_path, self.today, self.today, None, [])
+        assert tasks is not None
+        titles = sorted(t.title for t in tasks)
+        assert titles == ["Modified task", "New task", "Task 1", "Task 4"]
+
+    def test_today_shorthand(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text("- [ ] Task [d:t]\n")
+        build_snapshot(tmp_path, self.today)
+        tomorrow = date(2022, 1, 6)
+        tasks = visible_tasks(tmp_path, tomorrow, tomorrow, None, [])
+        assert tasks is not None
+        (task,) = tasks
+        assert task.attrs.date_attr.due_date == tomorrow
+        # Dates without a year depend on the year the snapshot was built in
+        assert visible_tasks(tmp_path, date(2023, 1, 1), date(2023, 1, 1), None, []) is None
+
+    def test_priorities(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text("- [ ] Negative [d:t] [!-1]\n- [ ] Zero [d:t] [!0]\n- [ ] None [d:t]\n")
+        build_snapshot(tmp_path, self.today)
+        tasks = visible_tasks(tmp_path, self.today, self.today, None, [])
+        assert tasks is not None
+        assert [t.attrs.priority_attr.priority if t.attrs.priority_attr else None for t in tasks] == [-1, 0, None]
+
+    def test_corrupt_snapshot(self, tmp_path: Path) -> None:
+        (tmp_path / "tasks.md").write_text(self.tasks_md)
+        build_snapshot(tmp_path, self.today)
+        data = snapshot_path(tmp_path).read_bytes()
+        # Truncated snapshots (and ones of another format) are ignored, the task files are parsed instead
+        for corrupt in [data[:4], data[:20], data[: len(data) // 2], data[:-1], b"TODAYSN1" + data[8:]]:
+            snapshot_path(tmp_path).write_bytes(corrupt)
+            assert visible_tasks(tmp_path, self.today, self.today, None, []) is None
@@ -133,3 +133,14 @@ class TestTask:
             [due_1_7, due_1_5, pri1_task, pri0_task],
             key=functools.partial(task_sorter, today=today),
         ) == [pri0_task, pri1_task, due_1_5, due_1_7]
+
+    def test_nested_task_is_displayed(self) -> None:
+        leaf = Task(title="leaf", attrs=TaskAttributes(DateAttribute(due_date=date(2022, 1, 5))))
+        middle = Task(title="middle", subtasks=[leaf])
+        root = Task(title="root", subtasks=[middle])
+        assert root.is_displayed(date(2022, 1, 4)) is False
+        assert root.is_displayed(date(2022, 1, 5)) is True
+        # The whole subtask tree is memoized by the bottom-up pass
+        assert middle._displayed == {(date(2022, 1, 4), 0): False, (date(2022, 1, 5), 0): True}
+        assert leaf._displayed == {(date(2022, 1, 4), 0): False, (date(2022, 1, 5), 0): True}
+        assert replace(root, done=True).is_displayed(date(2022, 1, 5)) is False
@@ -0,0 +1,78 @@
+import shutil
+from pathlib import Path
+from datetime import date, datetime
+from typing import List
+
+from today import timelog
+from today.task import Task
+from today.timelog import TimeRecord, adhoc_record, stop_record
+
+
+def ts(year: int, month: int, day: int, hour: int, minute: int) -> int:
+    return int(datetime(year, month, day, hour, minute).timestamp())
+
+
+class TestTimeLog:
+    def test_record_roundtrip(self) -> None:
+        record = TimeRecord(100, "abc", "tasks.md", "Heading / Sub", "Title\twith tab")
+        assert TimeRecord.from_line(record.to_line()) == TimeRecord(
+            100, "abc", "tasks.md", "Heading / Sub", "Title with tab"
+        )
+        assert TimeRecord.from_line(stop_record(5).to_line()) == stop_record(5)
+
+    def test_task_fingerprint_ignores_displayed_path(self, tmp_path: Path) -> None:
+        task = Task(path=["H"], title="Task", file_path=tmp_path / "work" / "a.md")
+        identity = timelog.file_identity("work", "a.md")
+        single = timelog.task_record(task, "a.md", identity, 0)
+        multiple = timelog.task_record(task, "work/a.md", identity, 0)
+        assert single.fingerprint == multiple.fingerprint
+        other = timelog.task_record(task, "a.md", timelog.file_identity("home", "a.md"), 0)
+        assert single.fingerprint != other.fingerprint
+
+    def test_log_outside_cache_dir(self, tmp_path: Path) -> None:
+        old_log = tmp_path / ".today" / "time.log"
+        old_log.parent.mkdir()
+        old_log.write_text(TimeRecord(ts(2022, 1, 5, 9, 0), "t1", "a.md", "H", "Task 1").to_line())
+        timelog.append_record(tmp_path, stop_record(ts(2022, 1, 5, 10, 0)))
+        # The log of an older version is moved out of the cache directory, and kept when the cache is cleared
+        assert not old_log.exists()
+        shutil.rmtree(tmp_path / ".today")
+        summary = timelog.update_summary(tmp_path)
+        assert timelog.aggregate(summary, date(2022, 1, 5), date(2022, 1, 5), "task") == [("a.md / H / Task 1", 3600)]
+
+    def test_malformed_records(self, tmp_path: Path) -> None:
+        timelog.append_record(tmp_path, TimeRecord(ts(2022, 1, 5, 9, 0), "t1", "a.md", "H", "Task 1"))
+        with timelog.log_path(tmp_path).open("a") as f:
+            f.write("edited by hand\n")
+        timelog.append_record(tmp_path, stop_record(ts(2022, 1, 5, 10, 0)))
+        warnings: List[str] = []
+        summary = timelog.update_summary(tmp_path, warnings)
+        assert len(warnings) == 1 and "edited by hand" in warnings[0]
+        # The checkpoint moves past the malformed record
+        assert summary.offset == timelog.log_path(tmp_path).stat().st_size
+        assert timelog.aggregate(summary, date(2022, 1, 5), date(2022, 1, 5), "task") == [("a.md / H / Task 1", 3600)]
+
+    def test_aggregate_with_checkpoint(self, tmp_path: Path) -> None:
+        task = TimeRecord(ts(2022, 1, 5, 23, 0), "t1", "a.md", "H", "Task 1")
+        timelog.append_record(tmp_path, task)
+        timelog.append_record(tmp_path, adhoc_record("Ad-hoc", ts(2022, 1, 6, 1, 0)))
+        timelog.append_record(tmp_path, stop_record(ts(2022, 1, 6, 1, 30)))
+
+        summary = timelog.update_summary(tmp_path)
+        assert summary.offset == timelog.log_path(tmp_path).stat().st_size
+        # Time is split at midnight
+        assert timelog.aggregate(summary, date(2022, 1, 5), date(2022, 1, 5), "task") == [
+            ("a.md / H / Task 1", 3600)
+        ]
+        assert timelog.aggregate(summary, date(2022, 1, 5), date(2022, 1, 6), "file") == [
+            ("a.md", 7200),
+            ("(ad-hoc tasks)", 1800),
+        ]
+
+        # Only the records appended after the checkpoint are read, the open task counts up to now
+        timelog.append_record(tmp_path, TimeRecord(ts(2022, 1, 7, 9, 0), "t1", "a.md", "H", "Task 1"))
+        summary = timelog.update_summary(tmp_path)
+        assert summary.open_record is not None
+        assert timelog.aggregate(
+            summary, date(2022, 1, 7), date(2022, 1, 7), "heading", now=ts(2022, 1, 7, 9, 15)
+        ) == [("a.md / H", 900)]
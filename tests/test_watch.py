@@ -0,0 +1,53 @@
+import pytest
+from pathlib import Path
+from datetime import date
+
+from rich.console import Group
+
+from today import api
+from today.api import ParseCache, iter_tasks
+from today.cli import parse_args, build_parser, tasks_to_tree, RenderedSubtree
+from today.watch import PollingWatcher, render
+
+
+class TestWatch:
+    def test_polling_watcher(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text("- [ ] Task [d:t]\n")
+        watcher = PollingWatcher([tmp_path], interval=0.01)
+        assert watcher.wait(timeout=0.05, debounce=0.01) is False
+        (tmp_path / "b.md").write_text("- [ ] Other task [d:t]\n")
+        assert watcher.wait(timeout=0.05, debounce=0.01) is True
+        assert watcher.wait(timeout=0.05, debounce=0.01) is False
+
+    def test_subtree_cache(self, tmp_path: Path) -> None:
+        (tmp_path / "a.md").write_text("# A\n\n- [ ] Task A [d:1/4/2022]\n")
+        (tmp_path / "b.md").write_text("# B\n\n- [ ] Task B [d:1/5/2022]\n")
+        args = parse_args(build_parser(), ["--dir", str(tmp_path), "--today", "1/5/2022"])
+        cache = ParseCache()
+        subtrees: dict = {}
+
+        def render():
+            tasks = list(iter_tasks(tmp_path, today=date(2022, 1, 5), cache=cache))
+            return tasks_to_tree(args, tasks, subtrees)
+
+        first = render()
+        second = render()
+        # Nothing changed, so both heading subtrees are reused
+        assert all(c1 is c2 for c1, c2 in zip(first.children, second.children))
+
+        (tmp_path / "b.md").write_text("# B\n\n- [ ] Task B changed [d:1/5/2022]\n")
+        third = render()
+        assert third.children[0] is first.children[0]
+        assert third.children[1] is not first.children[1]
+        assert all(isinstance(s, RenderedSubtree) for s in subtrees.values())
+        assert len(subtrees) == 2
+
+    def test_deleted_while_parsing(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        (tmp_path / "a.md").write_text("- [ ] Task A [d:1/5/2022]\n")
+        listed = [tmp_path / "a.md", tmp_path / "saved-by-rename.md"]
+        # The second file is listed, then deleted before it is read
+        monkeypatch.setattr(api, "iter_task_files", lambda root: iter(listed))
+        args = parse_args(build_parser(), ["--dir", str(tmp_path), "--today", "1/5/2022"])
+        rendered = render(args, {}, {})
+        assert isinstance(rendered, Group)
+        assert [t.title for t in iter_tasks(tmp_path, today=date(2022, 1, 5), cache=ParseCache())] == ["Task A"]
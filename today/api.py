@@ -0,0 +1,174 @@
+import functools
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from today.task import Task, assignee_index, task_sorter
+from today.parser import Diagnostic, iter_task_files, parse_task_file
+from today import git
+
+# A Python API for embedding 'today' in other programs (dashboards, bots, long-running services)
+# Nothing here prints, exits, or mutates the returned tasks. Pass the same ParseCache to repeated
+# calls to only re-parse the task files that changed since the last call.
+# Tasks may be shared between calls through the cache, so treat them as read-only.
+
+
+@dataclass
+class ParsedFile:
+    mtime_ns: int
+    size: int
+    today: date  # [d:t] and dates without a year are resolved relative to this date
+    tasks: List[Task]
+    diagnostics: List[Diagnostic]
+    # Assignee -> the tasks assigned to them (see task.assignee_index)
+    assignees: Dict[str, List[Task]]
+
+
+# Parse the task file at [path] (or its contents [text], e.g. from a git blob)
+def parse_file(
+    path: Path, today: date, text: Optional[str] = None, mtime_ns: int = 0, size: int = 0
+) -> ParsedFile:
+    diagnostics: List[Diagnostic] = []
+    tasks = parse_task_file(path, today, text=text, diagnostics=diagnostics)
+    return ParsedFile(mtime_ns, size, today, tasks, diagnostics, assignee_index(tasks))
+
+
+class ParseCache:
+    def __init__(self) -> None:
+        self.files: Dict[Path, ParsedFile] = {}
+        # Task files read from git revisions, by (blob SHA, path). Blobs never change, so mtime_ns is unused
+        self.blobs: Dict[Tuple[str, Path], ParsedFile] = {}
+        self.lock = threading.Lock()
+
+    # The tasks (and diagnostics) in [path], re-parsed only if the file has changed (or the date has)
+    def parse(self, path: Path, today: date) -> ParsedFile:
+        stat = path.stat()
+        with self.lock:
+            parsed = self.files.get(path)
+        if (
+            parsed is None
+            or parsed.mtime_ns != stat.st_mtime_ns
+            or parsed.size != stat.st_size
+            or parsed.today != today
+        ):
+            parsed = parse_file(path, today, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            with self.lock:
+                self.files[path] = parsed
+        return parsed
+
+    # The tasks in the git blob [sha] (read with [reader]) for the task file at [path]
+    # Revisions that share a version of a task file share its parsed tasks
+    def parse_blob(self, path: Path, sha: str, today: date, reader: git.BlobReader) -> ParsedFile:
+        with self.lock:
+            parsed = self.blobs.get((sha, path))
+        if parsed is None or parsed.today != today:
+            contents = reader.read(sha)
+            parsed = parse_file(path, today, text=contents.decode(), size=len(contents))
+            with self.lock:
+                self.blobs[(sha, path)] = parsed
+        return parsed
+
+    # Forget the files under [root] that weren't [seen] in the last walk (they were deleted)
+    def prune(self, root: Path, seen: Set[Path]) -> None:
+        with self.lock:
+            for path in [p for p in self.files if p not in seen and root in p.parents]:
+                del self.files[path]
+
+
+# Every parsed task file under [root]
+# With [rev], the task files are read as they were at that git revision instead of from the working tree
+def iter_parsed_files(
+    root: Path,
+    today: date,
+    cache: Optional[ParseCache] = None,
+    rev: Optional[str] = None,
+) -> Iterator[ParsedFile]:
+    if rev is not None:
+        blobs = git.list_task_blobs(root, rev)
+        with git.BlobReader(root) as reader:
+            for rel_path, sha in blobs:
+                if cache is None:
+                    yield parse_file(root / rel_path, today, text=reader.read(sha).decode())
+                else:
+                    yield cache.parse_blob(root / rel_path, sha, today, reader)
+        return
+    seen: Set[Path] = set()
+    for file in iter_task_files(root):
+        # Skip files that are deleted after they are listed (e.g. by editors that save by renaming a new file)
+        try:
+            parsed = parse_file(file, today) if cache is None else cache.parse(file, today)
+        except FileNotFoundError:
+            continue
+        seen.add(file)
+        yield parsed
+    if cache is not None:
+        cache.prune(root, seen)
+
+
+# Every task in every task file under [root], parsed one file at a time
+# Problems in the task files don't stop parsing, they are appended to [diagnostics] (if given)
+# With [assignee], only the tasks assigned to them (directly or through a subtask) are yielded,
+# looked up in the assignee index of each file
+def iter_all_tasks(
+    root: Path,
+    today: date,
+    cache: Optional[ParseCache] = None,
+    diagnostics: Optional[List[Diagnostic]] = None,
+    rev: Optional[str] = None,
+    assignee: Optional[str] = None,
+) -> Iterator[Task]:
+    for parsed in iter_parsed_files(root, today, cache, rev):
+        if assignee is None:
+            yield from parsed.tasks
+        else:
+            yield from parsed.assignees.get(assignee, [])
+        if diagnostics is not None:
+            diagnostics.extend(parsed.diagnostics)
+
+
+# The tasks under [root] that are displayed [lookahead] days after [today] (all tasks if [lookahead]
+# is None) and match the [where] predicate.
+# With [sort], tasks are yielded in the same order as the 'today' listing, so the n-th task is task id n.
+# Otherwise, tasks are yielded lazily as each task file is parsed.
+# With [rev], the task files are read as they were at that git revision.
+# With [assignee], only the tasks assigned to them are yielded.
+def iter_tasks(
+    root: Path,
+    today: Optional[date] = None,
+    lookahead: Optional[int] = 0,
+    where: Optional[Callable[[Task], bool]] = None,
+    cache: Optional[ParseCache] = None,
+    sort: bool = True,
+    diagnostics: Optional[List[Diagnostic]] = None,
+    rev: Optional[str] = None,
+    assignee: Optional[str] = None,
+) -> Iterator[Task]:
+    today = date.today() if today is None else today
+    date_filter = None if lookahead is None else today + timedelta(days=lookahead)
+    tasks = (
+        task
+        for task in iter_all_tasks(root, today, cache, diagnostics, rev, assignee)
+        if (date_filter is None or task.is_displayed(date_filter))
+        and (where is None or where(task))
+    )
+    if sort:
+        yield from sorted(tasks, key=functools.partial(task_sorter, today=today))
+    else:
+        yield from tasks
+
+
+# The task shown as [task_id] by 'today' (with the same [today] and [lookahead])
+def get_task(
+    root: Path,
+    task_id: int,
+    today: Optional[date] = None,
+    lookahead: int = 0,
+    cache: Optional[ParseCache] = None,
+    rev: Optional[str] = None,
+) -> Task:
+    tasks = list(iter_tasks(root, today=today, lookahead=lookahead, cache=cache, rev=rev))
+    if task_id < 0 or task_id >= len(tasks):
+        raise IndexError(f"The task_id {task_id} does not exist")
+    return tasks[task_id]
@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+from typing import Iterable, Union
+
+# Helpers for the state that 'today' keeps next to the task files in [task_dir]/.today
+# Everything in there is derived from the task files and can be deleted
+# The directory ignores itself (with a .gitignore) so that it doesn't show up in git-tracked task directories
+
+cache_dir_name = ".today"
+
+
+def cache_dir(task_dir: Path) -> Path:
+    return task_dir / cache_dir_name
+
+
+# Create [directory] (in a cache directory) before writing to it
+def make_cache_dirs(directory: Path) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    for d in [directory, *directory.parents]:
+        if d.name == cache_dir_name:
+            gitignore = d / ".gitignore"
+            if not gitignore.exists():
+                gitignore.write_text("*\n")
+            return
+
+
+# Write [text] to [path] so that readers see either the old or the new contents, never a partial write
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write_chunks(path, [text])
+
+
+# Like atomic_write_text, but [chunks] are written one after the other as they are produced
+# Newlines are written as they are (e.g. CRLF stays CRLF)
+def atomic_write_chunks(path: Path, chunks: Iterable[str]) -> None:
+    atomic_write(path, "w", chunks)
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    atomic_write(path, "wb", [data])
+
+
+def atomic_write(path: Path, mode: str, chunks: Iterable[Union[str, bytes]]) -> None:
+    import tempfile  # slow to import, and not needed by the readers of the cache (e.g. today-complete)
+
+    make_cache_dirs(path.parent)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, newline="" if mode == "w" else None) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
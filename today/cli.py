@@ -1,18 +1,21 @@
 import argparse
-import sys
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import itertools
 from datetime import date, timedelta
-from typing import List, Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 import functools
-from dataclasses import dataclass
+import itertools
+from dataclasses import dataclass, field
 
 from rich.tree import Tree
 from rich.console import Console
 from rich.markdown import Markdown
 
-from today.task import Task, task_sorter, days
-from today.parser import parse_markdown
+from today.task import Task, assignee_index, task_sorter, days
+from today.parser import Diagnostic
+from today import index, api, snapshot, timelog
+from today.options import parse_date, default_config_path, find_task_dirs
 
 
 @dataclass(frozen=True)
@@ -21,20 +24,87 @@ class CliArgs:
     today: date
     lookahead_days: timedelta
     task_id: Optional[Union[int, str]]
+    use_index: bool = False
+    # Task directories beyond [task_dir], from repeated --dir arguments or the roots config file
+    extra_dirs: Tuple[Path, ...] = ()
+    # Show the task files as they were at this git revision (--at) instead of the working tree
+    at_rev: Optional[str] = None
+    # Only show the tasks assigned to this person (--assignee)
+    assignee: Optional[str] = None
 
     # Only display tasks that are due / have reminders up to and including this day
     def task_date_filter(self) -> date:
         return self.today + self.lookahead_days
 
+    def task_dirs(self) -> Tuple[Path, ...]:
+        return (self.task_dir,) + self.extra_dirs
+
+    # The task directory that contains [file]
+    def root_of(self, file: Path) -> Path:
+        for root in self.task_dirs():
+            if root in file.parents:
+                return root
+        raise ValueError(f"{file} is not in any task directory")
+
+    # The path of [file] that is displayed to the user, relative to its task directory
+    # With multiple task directories, the path is prefixed with the label of its task directory
+    def display_path(self, file: Path) -> str:
+        root = self.root_of(file)
+        rel_path = file.relative_to(root).as_posix()
+        if len(self.extra_dirs) == 0:
+            return rel_path
+        return f"{root_labels(self.task_dirs())[root]}/{rel_path}"
+
+    # The identity of [file] in task fingerprints (time log records and exported UIDs)
+    def file_identity(self, file: Path) -> str:
+        root = self.root_of(file)
+        return timelog.file_identity(root_labels(self.task_dirs())[root], file.relative_to(root).as_posix())
+
+
+# The label of each task directory: its name, or as many of its trailing path components as it takes
+# to tell it apart from the other task directories (e.g. x/notes and y/notes)
+@functools.lru_cache(maxsize=None)
+def root_labels(roots: Tuple[Path, ...]) -> Dict[Path, str]:
+    labels: Dict[Path, str] = {}
+    for root in roots:
+        k = next(
+            (
+                k
+                for k in range(1, len(root.parts))
+                if not any(other != root and other.parts[-k:] == root.parts[-k:] for other in roots)
+            ),
+            len(root.parts),
+        )
+        labels[root] = Path(*root.parts[-k:]).as_posix()
+    return labels
+
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
+    add_common_args(parser)
+    parser.add_argument(
+        "task_id",
+        type=str,
+        nargs="?",
+        help="Show the description of this specific task",
+    )
+    return parser
+
 
+# Arguments shared by 'today', 'start', and the 'today' subcommands
+def add_common_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "--dir",
         type=str,
+        action="append",
         required=False,
-        help="Search for Markdown task files in this directory",
+        help="Search for Markdown task files in this directory (can be given multiple times)",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        required=False,
+        help=f"A file listing task directories, one per line, used when there is no --dir (default: {default_config_path()})",
     )
     parser.add_argument(
         "--days",
@@ -49,22 +119,32 @@ def build_parser() -> argparse.ArgumentParser:
         help="Use this date as today's date, e.g. --today 3/4/2022",
     )
     parser.add_argument(
-        "task_id",
+        "--index",
+        action="store_true",
+        help="Serve the task listing from the SQLite task index in <dir>/.today (synced before use)",
+    )
+    parser.add_argument(
+        "--at",
         type=str,
-        nargs="?",
-        help="Show the description of this specific task",
+        required=False,
+        help="Show the task files as they were at this git revision, e.g. --at HEAD~10 (use with --today)",
+    )
+    parser.add_argument(
+        "--assignee",
+        type=str,
+        required=False,
+        help="Only show the tasks assigned to this person ([@name]), including tasks with a subtask assigned to them",
     )
-    return parser
 
 
 def parse_args(parser: argparse.ArgumentParser, args: List[str]) -> CliArgs:
-    ns = parser.parse_args(args)
-    if ns.dir:
-        task_dir = Path(ns.dir).resolve()
-        if not task_dir.is_dir():
-            raise ValueError(f"Provided --dir {ns.dir} is not a directory")
-    else:
-        task_dir = Path.cwd().resolve()
+    return args_from_namespace(parser.parse_args(args))
+
+
+# The CliArgs of arguments already parsed by a parser with add_common_args, for commands
+# that also need their own arguments from [ns]
+def args_from_namespace(ns: argparse.Namespace) -> CliArgs:
+    task_dirs = find_task_dirs(ns.dir, ns.config)
 
     if ns.days:
         lookahead_days = timedelta(days=int(ns.days))
@@ -72,12 +152,11 @@ def parse_args(parser: argparse.ArgumentParser, args: List[str]) -> CliArgs:
         lookahead_days = timedelta(days=0)
 
     if ns.today:
-        today_split = ns.today.split("/")
-        today = date(int(today_split[2]), int(today_split[0]), int(today_split[1]))
+        today = parse_date(ns.today)
     else:
         today = date.today()
     task_id: Optional[Union[int, str]]
-    if not ns.task_id:
+    if not getattr(ns, "task_id", None):
         task_id = None
     else:
         try:
@@ -85,44 +164,125 @@ def parse_args(parser: argparse.ArgumentParser, args: List[str]) -> CliArgs:
         except ValueError:
             task_id = ns.task_id
     return CliArgs(
-        task_dir=task_dir,
+        task_dir=task_dirs[0],
+        extra_dirs=tuple(task_dirs[1:]),
         lookahead_days=lookahead_days,
         today=today,
         task_id=task_id,
+        use_index=ns.index,
+        at_rev=ns.at,
+        assignee=ns.assignee,
     )
 
 
-def parse_task_files(args: CliArgs) -> List[Task]:
-    # Fetch Markdown task files
-    md_files = list(args.task_dir.glob("**/*.md"))
-
-    # Filter out broken symlinks (symlinks that don't exist)
-    md_files = [
-        file for file in md_files if not (file.is_symlink() and not file.exists())
-    ]
+# Every task in every task file in every task directory, parsed one file at a time
+def iter_tasks(args: CliArgs) -> Iterator[Task]:
+    for root in args.task_dirs():
+        yield from api.iter_all_tasks(root, args.today, rev=args.at_rev, assignee=args.assignee)
 
-    # Parse each Markdown task file
-    tasks_by_file: List[List[Task]] = [
-        parse_markdown(file.read_text().split("\n"), today=args.today)
-        for file in md_files
-    ]
 
-    # Set each task's file path
-    for filepath, tasklist in zip(md_files, tasks_by_file):
-        for task in tasklist:
-            task.file_path = filepath
+# The visible tasks of a single task directory, sorted by task_sorter
+# Problems found in the task files are appended to [diagnostics]
+def parse_root(
+    args: CliArgs,
+    root: Path,
+    cache: Optional[api.ParseCache],
+    diagnostics: List[Diagnostic],
+) -> List[Task]:
+    # The index mirrors the working tree, it can't serve other revisions
+    if args.use_index and args.at_rev is None:
+        conn = index.connect(root)
+        try:
+            index.sync_index(conn, root, args.today)
+            tasks_visible = index.visible_tasks(conn, root, args.task_date_filter(), args.assignee)
+            diagnostics.extend(index.file_diagnostics(conn, root))
+        finally:
+            conn.close()
+        tasks_visible.sort(key=functools.partial(task_sorter, today=args.today))
+        return tasks_visible
 
-    # Flatten the task list
-    tasks: List[Task] = list(itertools.chain(*tasks_by_file))
+    # Serve the listing from the snapshot written by 'today index build' (if there is one)
+    # A ParseCache (e.g. from --watch) is more up to date than the snapshot, so it is used instead
+    if args.at_rev is None and cache is None:
+        snapshot_tasks = snapshot.visible_tasks(
+            root, args.today, args.task_date_filter(), args.assignee, diagnostics
+        )
+        if snapshot_tasks is not None:
+            snapshot_tasks.sort(key=functools.partial(task_sorter, today=args.today))
+            return snapshot_tasks
 
     # Only look at tasks that have a due/reminder date on today or number of 'days' in the future
-    tasks_visible: List[Task] = [
-        task for task in tasks if task.is_displayed(args.task_date_filter())
-    ]
+    # The task files are streamed so that only the visible tasks are held in memory
+    return list(
+        api.iter_tasks(
+            root,
+            today=args.today,
+            lookahead=args.lookahead_days.days,
+            cache=cache,
+            diagnostics=diagnostics,
+            rev=args.at_rev,
+            assignee=args.assignee,
+        )
+    )
+
+
+# Parse the task directories (at the same time, some of them may be on slow mounts) into
+# per-directory sorted task lists, then merge them into one sorted list
+# Pass [caches] to keep a ParseCache per task directory across calls
+# Problems found in the task files don't stop parsing, they are appended to [diagnostics] (if given)
+def parse_task_files(
+    args: CliArgs,
+    caches: Optional[Dict[Path, api.ParseCache]] = None,
+    diagnostics: Optional[List[Diagnostic]] = None,
+) -> List[Task]:
+    roots = args.task_dirs()
+    root_caches = [caches.setdefault(root, api.ParseCache()) if caches is not None else None for root in roots]
+    root_diagnostics: List[List[Diagnostic]] = [[] for _ in roots]
+    if len(roots) == 1:
+        tasks_by_root = [parse_root(args, roots[0], root_caches[0], root_diagnostics[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(roots)) as pool:
+            tasks_by_root = list(
+                pool.map(functools.partial(parse_root, args), roots, root_caches, root_diagnostics)
+            )
+    if diagnostics is not None:
+        for d in root_diagnostics:
+            diagnostics.extend(d)
+    if len(roots) == 1:
+        return tasks_by_root[0]
 
     # Sort tasks by their priorities and headings and due dates
-    tasks_visible.sort(key=functools.partial(task_sorter, today=args.today))
-    return tasks_visible
+    return list(
+        heapq.merge(*tasks_by_root, key=functools.partial(task_sorter, today=args.today))
+    )
+
+
+def format_diagnostic(args: CliArgs, diagnostic: Diagnostic) -> str:
+    assert diagnostic.file_path is not None
+    return f"{args.display_path(diagnostic.file_path)}:{diagnostic.line_number}: {diagnostic.message}"
+
+
+# Markdown list items for [subtasks] and their own subtasks, nested by indentation
+def subtask_lines(subtasks: Sequence[Task], today: date, depth: int) -> List[str]:
+    lines: List[str] = []
+    for subtask in subtasks:
+        subtask_summary = subtask.summary(today)
+        if subtask.done:
+            lines.append(f"{'    ' * depth}- **DONE**: {subtask.title} {subtask_summary}")
+        else:
+            lines.append(f"{'    ' * depth}- {subtask.title} {subtask_summary}")
+        lines.extend(subtask_lines(subtask.subtasks, today, depth + 1))
+    return lines
+
+
+# ' @name' after the title of a task that is assigned to someone
+# Subtasks only show an assignee that differs from their parent's, they inherit it otherwise
+def assignee_str(task: Task, parent: Optional[Task] = None) -> str:
+    if task.attrs.assn_attr is None:
+        return ""
+    if parent is not None and parent.attrs.assn_attr == task.attrs.assn_attr:
+        return ""
+    return f" @{task.attrs.assn_attr.assigned_to}"
 
 
 def display_specific_task(task: Task, today: date, console: Console) -> None:
@@ -133,81 +293,303 @@ def display_specific_task(task: Task, today: date, console: Console) -> None:
 
     if len(task.subtasks) > 0:
         console.print(Markdown("**Subtasks**:"))
-    for subtask in task.subtasks:
-        subtask_summary = subtask.summary(today)
-        if subtask.done:
-            console.print(Markdown(f"- **DONE**: {subtask.title} {subtask_summary}"))
-        else:
-            console.print(Markdown(f"- {subtask.title} {subtask_summary}"))
-    if len(task.subtasks) > 0:
+        console.print(Markdown("\n".join(subtask_lines(task.subtasks, today, 0))))
         console.print("")
 
-    sys.exit(0)
 
+# A rendered top-level heading subtree, kept around to skip re-rendering headings whose tasks haven't changed
+@dataclass
+class RenderedSubtree:
+    args: CliArgs
+    tasks: List[Tuple[int, Task]]
+    tree: Tree
 
-def tasks_to_tree(args: CliArgs, tasks: List[Task]) -> Tree:
-    # Print tasks as a tree
-    tree = Tree(
-        f"[bold underline]Tasks for today[/bold underline] ({args.today})"
-        + (
-            ""
-            if args.lookahead_days == timedelta(0)
-            else f" (+{days(args.lookahead_days)})"
+    # The subtree can be reused if it was rendered with the same arguments, for the same task ids
+    # and task objects (a changed task file is re-parsed into new task objects)
+    def matches(self, args: CliArgs, tasks: List[Tuple[int, Task]]) -> bool:
+        return (
+            self.args == args
+            and len(self.tasks) == len(tasks)
+            and all(i == j and t1 is t2 for (i, t1), (j, t2) in zip(self.tasks, tasks))
         )
+
+
+def tasks_title(args: CliArgs) -> str:
+    return f"[bold underline]Tasks for today[/bold underline] ({args.today})" + (
+        "" if args.lookahead_days == timedelta(0) else f" (+{days(args.lookahead_days)})"
     )
 
-    # Tasks should already be sorted with priority tasks first, then non-priority tasks
-    priority_tasks = [t for t in tasks if t.attrs.priority_attr is not None]
-    other_tasks = [t for t in tasks if t.attrs.priority_attr is None]
+
+def tasks_to_tree(
+    args: CliArgs,
+    tasks: List[Task],
+    subtree_cache: Optional[Dict[str, RenderedSubtree]] = None,
+) -> Tree:
+    # Print tasks as a tree
+    tree = Tree(tasks_title(args))
+    add_tasks_to_tree(args, tree, list(enumerate(tasks)), subtree_cache)
+    return tree
+
+
+priority_label = "[bold]Priority Tasks[/bold]"
+
+
+# The labels of the nodes in the task tree
+def priority_task_label(args: CliArgs, i: int, task: Task) -> Markdown:
+    # f"[bold]{i}[/bold] - [blue]{' / '.join(task.path)}[/blue] [blue bold]➔[/blue bold]  {task.title} {Markdown(task.summary(args.today))} ([red italic]{args.display_path(task.file_path)}:{task.line_number}[/red italic])"
+    return Markdown(
+        f"**{i}** - {' / '.join(task.path)} → {task.title}{assignee_str(task)} {task.summary(args.today)} (*{args.display_path(task.file_path)}:{task.line_number}*)"
+    )
+
+
+def task_label(args: CliArgs, i: int, task: Task) -> Markdown:
+    return Markdown(
+        f"**{i}** - {task.title}{assignee_str(task)} {task.summary(args.today)} (*:{task.line_number}*)"
+    )
+
+
+def subtask_label(args: CliArgs, subtask: Task, parent: Task) -> Markdown:
+    return Markdown(f"{subtask.title}{assignee_str(subtask, parent)} {subtask.summary(args.today)}")
+
+
+# The top-level heading should contain the file path of its associated markdown file
+def top_label(args: CliArgs, task: Task) -> str:
+    return f"[bold]{task.path[0]}[/bold] ([red italic]{args.display_path(task.file_path)}[/red italic])"
+
+
+# Group [numbered_tasks] (task id, task) under [tree] by their heading paths
+# The tasks should already be sorted with priority tasks first, then non-priority tasks
+# Top-level heading subtrees are reused from (and saved to) the [subtree_cache] if one is given,
+# headings that are no longer shown are dropped from it
+def add_tasks_to_tree(
+    args: CliArgs,
+    tree: Tree,
+    numbered_tasks: Sequence[Tuple[int, Task]],
+    subtree_cache: Optional[Dict[str, RenderedSubtree]] = None,
+) -> None:
+    priority_tasks = [(i, t) for i, t in numbered_tasks if t.attrs.priority_attr is not None]
+    other_tasks = [(i, t) for i, t in numbered_tasks if t.attrs.priority_attr is None]
 
     if len(priority_tasks) > 0:
-        priority_label = tree.add("[bold]Priority Tasks[/bold]")
-        for i, task in enumerate(priority_tasks):
-            priority_label.add(
-                # f"[bold]{i}[/bold] - [blue]{' / '.join(task.path)}[/blue] [blue bold]➔[/blue bold]  {task.title} {Markdown(task.summary(args.today))} ([red italic]{task.file_path.relative_to(args.task_dir)}:{task.line_number}[/red italic])"
-                Markdown(
-                    f"**{i}** - {' / '.join(task.path)} → {task.title} {task.summary(args.today)} (*{task.file_path.relative_to(args.task_dir)}:{task.line_number}*)"
-                )
-            )
+        priority_node = tree.add(priority_label)
+        for i, task in priority_tasks:
+            priority_node.add(priority_task_label(args, i, task))
 
-    def add_to_tree(task: Task, tree: Tree, task_idx: int, first_call: bool) -> Tree:
-        if len(task.path) == 0:  # Base case
-            parent = tree.add(
-                Markdown(
-                    f"**{task_idx}** - {task.title} {task.summary(args.today)} (*:{task.line_number}*)"
-                )
-            )
-            if task.subtasks:
-                for subtask in task.subtasks:
-                    if subtask.done is False and subtask.is_displayed(
-                        args.today, args.lookahead_days.days
-                    ):
-                        parent.add(
-                            Markdown(f"{subtask.title} {subtask.summary(args.today)}")
-                        )
+    # Visibility was memoized for the whole subtask tree when the tasks were filtered
+    def add_subtasks_to_tree(task: Task, parent: Tree) -> None:
+        for subtask in task.subtasks:
+            if subtask.is_displayed(args.task_date_filter()):
+                child = parent.add(subtask_label(args, subtask, task))
+                add_subtasks_to_tree(subtask, child)
+
+    # Walk down the heading path of [task] (without mutating it), starting at heading [depth]
+    def add_to_tree(task: Task, tree: Tree, task_idx: int, depth: int) -> Tree:
+        if depth == len(task.path):  # Base case
+            parent = tree.add(task_label(args, task_idx, task))
+            add_subtasks_to_tree(task, parent)
             return tree
         else:
             labels = [t.label for t in tree.children]
             # Try to find the first heading in the current tree's children
-            # The top-level heading should contain the file path of its associated markdown file
             # All the subheadings should just be the raw heading
-            expected_label = (
-                f"{task.path[0]}"
-                if not first_call
-                else f"[bold]{task.path[0]}[/bold] ([red italic]{task.file_path.relative_to(args.task_dir)}[/red italic])"
-            )
+            expected_label = f"{task.path[depth]}" if depth > 0 else top_label(args, task)
             if (
                 expected_label in labels
             ):  # The first heading has been found, continue to traverse down its children
-                task.path = task.path[1:]
                 return add_to_tree(
-                    task, tree.children[labels.index(expected_label)], task_idx, False
+                    task, tree.children[labels.index(expected_label)], task_idx, depth + 1
                 )
             else:  # The first heading doesn't exist, create it and traverse down its children
                 child = tree.add(expected_label)
-                task.path = task.path[1:]
-                return add_to_tree(task, child, task_idx, False)
+                return add_to_tree(task, child, task_idx, depth + 1)
+
+    # Group the tasks by their top-level heading (keeping the order in which headings first appear)
+    # Tasks without any heading are added directly in between the headings
+    groups: Dict[str, List[Tuple[int, Task]]] = {}
+    order: List[Union[str, Tuple[int, Task]]] = []
+    for i, task in other_tasks:
+        if len(task.path) == 0:
+            order.append((i, task))
+            continue
+        label = top_label(args, task)
+        if label not in groups:
+            groups[label] = []
+            order.append(label)
+        groups[label].append((i, task))
+
+    for item in order:
+        if not isinstance(item, str):
+            add_to_tree(item[1], tree, item[0], 0)
+            continue
+        cached = subtree_cache.get(item) if subtree_cache is not None else None
+        if cached is not None and cached.matches(args, groups[item]):
+            tree.children.append(cached.tree)
+            continue
+        subtree = tree.add(item)
+        for i, task in groups[item]:
+            add_to_tree(task, subtree, i, 1)
+        if subtree_cache is not None:
+            subtree_cache[item] = RenderedSubtree(args, groups[item], subtree)
+
+    if subtree_cache is not None:
+        for label in [label for label in subtree_cache if label not in groups]:
+            del subtree_cache[label]
+
+
+# Paged output ('today --page N'): the rows of the task tree (one per heading, task and subtask) are laid out
+# from the sorted tasks and their heading paths without rendering anything, and only the rows of the
+# requested page are rendered (under their ancestor headings, even if those are on an earlier page)
+@dataclass
+class TreeRow:
+    # The keys of the ancestors of this row and of the row itself, outermost first
+    path: Tuple[str, ...]
+    label: Callable[[], Union[str, Markdown]]
+
+
+@dataclass
+class RowNode:
+    label: Callable[[], Union[str, Markdown]]
+    task: Optional[Task] = None
+    children: Dict[str, "RowNode"] = field(default_factory=dict)
+
+
+# The rows of tasks_to_tree(args, tasks) (without its title), in the order they are displayed
+# The priority section is yielded before the other tasks are grouped by heading, so the first page
+# can be printed while the rest of the tree is being laid out
+def tree_rows(args: CliArgs, tasks: List[Task]) -> Iterator[TreeRow]:
+    priority_tasks = [(i, t) for i, t in enumerate(tasks) if t.attrs.priority_attr is not None]
+    if len(priority_tasks) > 0:
+        yield TreeRow(("priority",), lambda: priority_label)
+        for i, task in priority_tasks:
+            yield TreeRow(("priority", f"#{i}"), functools.partial(priority_task_label, args, i, task))
+
+    # Headings are matched by their label, like add_tasks_to_tree does
+    root: Dict[str, RowNode] = {}
+    for i, task in enumerate(tasks):
+        if task.attrs.priority_attr is not None:
+            continue
+        children = root
+        for depth, heading in enumerate(task.path):
+            label = top_label(args, task) if depth == 0 else heading
+            if f"heading {label}" not in children:
+                children[f"heading {label}"] = RowNode(functools.partial(str, label))
+            children = children[f"heading {label}"].children
+        children[f"#{i}"] = RowNode(functools.partial(task_label, args, i, task), task)
 
-    for i, task in enumerate(other_tasks):
-        add_to_tree(task, tree, i + len(priority_tasks), True)
+    def subtask_rows(task: Task, path: Tuple[str, ...]) -> Iterator[TreeRow]:
+        for k, subtask in enumerate(task.subtasks):
+            if subtask.is_displayed(args.task_date_filter()):
+                yield TreeRow(path + (str(k),), functools.partial(subtask_label, args, subtask, task))
+                yield from subtask_rows(subtask, path + (str(k),))
+
+    def node_rows(children: Dict[str, RowNode], path: Tuple[str, ...]) -> Iterator[TreeRow]:
+        for key, node in children.items():
+            yield TreeRow(path + (key,), node.label)
+            if node.task is not None:
+                yield from subtask_rows(node.task, path + (key,))
+            yield from node_rows(node.children, path + (key,))
+
+    yield from node_rows(root, ())
+
+
+@dataclass
+class TreePage:
+    tree: Tree
+    # The number of rows before and on this page
+    start: int
+    count: int
+    # The rows after this page, laid out when they are consumed
+    rest: Iterator[TreeRow]
+
+
+# Render [count] rows of the task tree starting at row [start]
+def tree_page(args: CliArgs, tasks: List[Task], start: int, count: int) -> TreePage:
+    rows = tree_rows(args, tasks)
+    # The rows that lead to the current row, the ancestors of the first row are rendered with it
+    ancestors: List[TreeRow] = []
+    skipped = 0
+    for row in itertools.islice(rows, start):
+        ancestors = ancestors[: len(row.path) - 1] + [row]
+        skipped += 1
+
+    tree = Tree(tasks_title(args))
+    nodes: Dict[Tuple[str, ...], Tree] = {(): tree}
+    page_rows = list(itertools.islice(rows, count))
+    if len(page_rows) > 0:
+        for ancestor in ancestors[: len(page_rows[0].path) - 1]:
+            nodes[ancestor.path] = nodes[ancestor.path[:-1]].add(ancestor.label())
+    for row in page_rows:
+        nodes[row.path] = nodes[row.path[:-1]].add(row.label())
+    return TreePage(tree, skipped, len(page_rows), rows)
+
+
+# Sort [tasks] into per-day buckets in a single pass
+# Each visible task lands on the first day it is displayed (overdue tasks land on today)
+# Returns the sorted visible tasks (whose indices are the task ids, matching 'today --days N')
+# and a map from each day that has tasks to the ids of the tasks on that day
+def agenda_buckets(
+    args: CliArgs, tasks: Iterable[Task]
+) -> Tuple[List[Task], Dict[date, List[int]]]:
+    last_day = args.task_date_filter()
+    task_days: Dict[int, date] = {}
+    tasks_visible: List[Task] = []
+    for task in tasks:
+        day = task.agenda_date()
+        if day is not None and day <= last_day:
+            task_days[id(task)] = max(day, args.today)
+            tasks_visible.append(task)
+
+    tasks_visible.sort(key=functools.partial(task_sorter, today=args.today))
+    buckets: Dict[date, List[int]] = {}
+    for i, task in enumerate(tasks_visible):
+        buckets.setdefault(task_days[id(task)], []).append(i)
+    return tasks_visible, buckets
+
+
+def agenda_to_tree(args: CliArgs, tasks: Iterable[Task]) -> Tree:
+    tree = Tree(
+        f"[bold underline]Agenda[/bold underline] ({args.today})"
+        + (
+            ""
+            if args.lookahead_days == timedelta(0)
+            else f" (+{days(args.lookahead_days)})"
+        )
+    )
+    tasks_visible, buckets = agenda_buckets(args, tasks)
+    for day in sorted(buckets.keys()):
+        day_label = tree.add(
+            f"[bold]{day.strftime('%a')} {day}[/bold]"
+            + (" (today)" if day == args.today else "")
+        )
+        add_tasks_to_tree(args, day_label, [(i, tasks_visible[i]) for i in buckets[day]])
+    return tree
+
+
+# The task ids of the visible [tasks] (in task id order) of each assignee, looked up in an
+# assignee index built once over the listing. Tasks without any assignee are under None.
+def team_buckets(tasks: List[Task]) -> Dict[Optional[str], List[int]]:
+    task_ids = {id(task): i for i, task in enumerate(tasks)}
+    buckets: Dict[Optional[str], List[int]] = {
+        name: [task_ids[id(task)] for task in assigned]
+        for name, assigned in sorted(assignee_index(tasks).items())
+    }
+    unassigned = [i for i, task in enumerate(tasks) if len(task.assignees()) == 0]
+    if len(unassigned) > 0:
+        buckets[None] = unassigned
+    return buckets
+
+
+def team_to_tree(args: CliArgs, tasks: List[Task]) -> Tree:
+    tree = Tree(
+        f"[bold underline]Team tasks for today[/bold underline] ({args.today})"
+        + (
+            ""
+            if args.lookahead_days == timedelta(0)
+            else f" (+{days(args.lookahead_days)})"
+        )
+    )
+    for name, task_ids in team_buckets(tasks).items():
+        label = f"[bold]@{name}[/bold]" if name is not None else "[bold]Unassigned[/bold]"
+        person = tree.add(f"{label} ({len(task_ids)} tasks)")
+        add_tasks_to_tree(args, person, [(i, tasks[i]) for i in task_ids])
     return tree
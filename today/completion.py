@@ -0,0 +1,185 @@
+import functools
+import hashlib
+import heapq
+import json
+import os
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from today.cache import atomic_write_text
+from today.options import parse_date, find_task_dirs
+
+# Shell completion of task ids for 'today' and 'start'
+# The shell runs 'today-complete -- <words typed so far> <current word>' on every <TAB>, so it must be fast:
+# it doesn't import rich, and answers from the listing snapshot that 'today' saves (the task ids the user
+# saw last). The task files are only parsed if the snapshot is for another day or other options.
+# The snapshot is kept in the user's cache directory, so that 'today' doesn't write to the task directories
+
+
+# One snapshot per set of task directories, e.g. ~/.cache/today/listing-<hash>.json
+def listing_path(task_dirs: Sequence[Path]) -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    key = hashlib.sha1("\0".join(str(d) for d in task_dirs).encode()).hexdigest()[:16]
+    return Path(cache_home) / "today" / f"listing-{key}.json"
+
+
+# The options that determine the task ids
+def listing_key(
+    task_dirs: Sequence[Path], today: date, lookahead: int, rev: Optional[str], assignee: Optional[str]
+) -> Dict:
+    return {
+        "roots": [str(d) for d in task_dirs],
+        "today": today.isoformat(),
+        "lookahead": lookahead,
+        "at": rev,
+        "assignee": assignee,
+    }
+
+
+# [tasks] are the (title, heading path) of each task, in task id order
+def write_listing(
+    task_dirs: Sequence[Path],
+    today: date,
+    lookahead: int,
+    rev: Optional[str],
+    assignee: Optional[str],
+    tasks: Iterable[Tuple[str, str]],
+) -> None:
+    listing = listing_key(task_dirs, today, lookahead, rev, assignee)
+    listing["tasks"] = [list(t) for t in tasks]
+    atomic_write_text(listing_path(task_dirs), json.dumps(listing))
+
+
+def read_listing(
+    task_dirs: Sequence[Path], today: date, lookahead: int, rev: Optional[str], assignee: Optional[str]
+) -> Optional[List[Tuple[str, str]]]:
+    try:
+        listing = json.loads(listing_path(task_dirs).read_text())
+        tasks = listing.pop("tasks")
+    except (OSError, ValueError, KeyError):
+        return None
+    if listing != listing_key(task_dirs, today, lookahead, rev, assignee):
+        return None
+    return [(title, heading) for title, heading in tasks]
+
+
+# Parse the task files the same way as 'today' does, and save the snapshot for the next <TAB>
+def parse_listing(
+    task_dirs: Sequence[Path], today: date, lookahead: int, rev: Optional[str], assignee: Optional[str]
+) -> List[Tuple[str, str]]:
+    from today import api
+    from today.task import task_sorter
+
+    tasks = heapq.merge(
+        *[
+            api.iter_tasks(root, today=today, lookahead=lookahead, rev=rev, assignee=assignee)
+            for root in task_dirs
+        ],
+        key=functools.partial(task_sorter, today=today),
+    )
+    listing = [(task.title, " / ".join(task.path)) for task in tasks]
+    write_listing(task_dirs, today, lookahead, rev, assignee, listing)
+    return listing
+
+
+# Options that take a value, the word after them isn't a task id
+value_options = {"--dir", "--config", "--days", "--today", "--at", "--assignee"}
+
+
+# The options that take a value (by name) and the positional arguments in the words typed so far
+# argparse is too slow to import on every <TAB>, and the other options don't matter here
+def parse_words(typed: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+    options: Dict[str, List[str]] = {}
+    positional: List[str] = []
+    i = 0
+    while i < len(typed):
+        word = typed[i]
+        if word.startswith("--") and "=" in word:
+            name, value = word.split("=", 1)
+            options.setdefault(name, []).append(value)
+        elif word in value_options:
+            if i + 1 < len(typed):
+                options.setdefault(word, []).append(typed[i + 1])
+            i += 1
+        elif not word.startswith("-"):
+            positional.append(word)
+        i += 1
+    return options, positional
+
+
+# Completion candidates for the last word of [words] (the words after 'today' or 'start'),
+# as '<task id>\t<description>' lines
+def candidates(words: List[str]) -> List[str]:
+    *typed, current = words if len(words) > 0 else [""]
+    if current.startswith("-") or (len(typed) > 0 and typed[-1] in value_options):
+        return []
+
+    options, positional = parse_words(typed)
+    # Only the first positional argument is a task id (and 'today agenda' etc. don't take one)
+    if len(positional) > 0:
+        return []
+
+    last = lambda option: options[option][-1] if option in options else None
+    task_dirs = find_task_dirs(options.get("--dir"), last("--config"))
+    today_arg = last("--today")
+    today = parse_date(today_arg) if today_arg is not None else date.today()
+    lookahead = int(last("--days") or 0)
+    key = (task_dirs, today, lookahead, last("--at"), last("--assignee"))
+    listing = read_listing(*key)
+    if listing is None:
+        listing = parse_listing(*key)
+    return [
+        f"{task_id}\t{title} ({heading})" if heading else f"{task_id}\t{title}"
+        for task_id, (title, heading) in enumerate(listing)
+        if str(task_id).startswith(current)
+    ]
+
+
+scripts = {
+    "bash": """\
+_today_complete() {
+    local IFS=$'\\n'
+    local candidates=($(today-complete -- "${COMP_WORDS[@]:1:COMP_CWORD}" 2>/dev/null))
+    if [ ${#candidates[@]} -eq 1 ]; then
+        COMPREPLY=("${candidates[0]%%$'\\t'*}")
+    else
+        COMPREPLY=("${candidates[@]//$'\\t'/  }")
+    fi
+}
+complete -o default -F _today_complete today start
+""",
+    "zsh": """\
+_today_complete() {
+    local -a candidates
+    candidates=(${(f)"$(today-complete -- "${(@)words[2,CURRENT]}" 2>/dev/null)"})
+    if (( ${#candidates} )); then
+        candidates=("${(@)candidates//$'\\t'/:}")
+        _describe 'task' candidates
+    else
+        _files
+    fi
+}
+compdef _today_complete today start
+""",
+    "fish": """\
+for command in today start
+    complete -c $command -f -a '(today-complete -- (commandline -opc)[2..-1] (commandline -ct) 2>/dev/null)'
+    complete -c $command -l dir -r -F
+    complete -c $command -l config -r -F
+end
+""",
+}
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    if len(args) > 0 and args[0] == "--":
+        args = args[1:]
+    try:
+        lines = candidates(args)
+    except (OSError, ValueError):  # e.g. a --dir that doesn't exist (yet)
+        lines = []
+    if len(lines) > 0:
+        print("\n".join(lines))
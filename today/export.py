@@ -0,0 +1,191 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from today.task import Task
+from today.parser import Diagnostic, iter_task_files, parse_task_file, uses_today_shorthand
+from today.cache import cache_dir, atomic_write_chunks, atomic_write_text
+from today.timelog import task_fingerprint
+
+# 'today export --ics PATH': due dates as to-dos (VTODO) and reminders as all-day events (VEVENT) in an
+# iCalendar file, for calendar apps
+# UIDs are derived from the task fingerprint (task directory and file, heading, title) like the time log,
+# so calendar apps update the same entries across exports, also when task directories are added or moved.
+# The entries of each task file are rendered into a fragment that is cached in [task_dir]/.today/ics.json,
+# so only changed task files are rendered again.
+# The output is only rewritten when its contents change: exporting an untouched vault leaves it as is.
+
+ics_header = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//today//today export//EN\r\n"
+ics_footer = "END:VCALENDAR\r\n"
+
+
+def ics_cache_path(task_dir: Path) -> Path:
+    return cache_dir(task_dir) / "ics.json"
+
+
+def ics_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+# Lines are limited to 75 bytes, longer lines continue on the next line after a space
+def ics_line(line: str) -> str:
+    folded = ""
+    length = 0
+    for c in line:
+        size = len(c.encode())
+        if length + size > 75:
+            folded += "\r\n "
+            length = 1
+        folded += c
+        length += size
+    return folded + "\r\n"
+
+
+def ics_date(d: date) -> str:
+    return d.strftime("%Y%m%d")
+
+
+# The VTODO (due date) and VEVENT (reminder) of [task], which lives in [file] (as displayed by 'today')
+# [identity] is the file part of the task fingerprint (see timelog.file_identity)
+# [occurrence] counts the earlier tasks in the file with the same heading and title, UIDs must be unique
+def task_components(task: Task, file: str, identity: str, occurrence: int = 0) -> List[str]:
+    dates = task.attrs.date_attr
+    if not dates.due_date and not (dates.reminder_date and not task.done):
+        return []
+    heading = " / ".join(task.path)
+    uid = task_fingerprint(identity, heading, task.title) + (f"-{occurrence}" if occurrence > 0 else "")
+    # DTSTAMP is required, derive it from the task so that unchanged tasks export the same way
+    stamp_date = dates.created_date or dates.due_date or dates.reminder_date
+    assert stamp_date is not None
+    common = [
+        f"DTSTAMP:{ics_date(stamp_date)}T000000Z",
+        f"SUMMARY:{ics_escape(task.title)}",
+        f"DESCRIPTION:{ics_escape(' / '.join([file, *task.path]))}:{task.line_number}",
+    ]
+    lines: List[str] = []
+    if dates.due_date:
+        lines += ["BEGIN:VTODO", f"UID:{uid}-due@today", *common]
+        lines.append(f"DUE;VALUE=DATE:{ics_date(dates.due_date)}")
+        if task.attrs.priority_attr is not None:
+            # 1 is the highest iCalendar priority, 0 means undefined
+            lines.append(f"PRIORITY:{min(task.attrs.priority_attr.priority + 1, 9)}")
+        lines.append("STATUS:COMPLETED" if task.done else "STATUS:NEEDS-ACTION")
+        lines.append("END:VTODO")
+    if dates.reminder_date and not task.done:
+        lines += ["BEGIN:VEVENT", f"UID:{uid}-reminder@today", *common]
+        lines.append(f"DTSTART;VALUE=DATE:{ics_date(dates.reminder_date)}")
+        lines.append("TRANSP:TRANSPARENT")
+        lines.append("END:VEVENT")
+    return lines
+
+
+def file_fragment(tasks: List[Task], file: str, identity: str) -> str:
+    occurrences: Dict[Tuple[Tuple[str, ...], str], int] = {}
+    lines: List[str] = []
+    for task in tasks:
+        key = (tuple(task.path), task.title)
+        lines += task_components(task, file, identity, occurrences.get(key, 0))
+        occurrences[key] = occurrences.get(key, 0) + 1
+    return "".join(ics_line(line) for line in lines)
+
+
+@dataclass
+class ExportResult:
+    files_rendered: int
+    files_cached: int
+    written: bool
+
+
+# Dates without a year depend on the current year, and files with [d:t] depend on the current date
+def fragment_key(stat_key: List[int], today: date, uses_today: bool, file: str, identity: str) -> List:
+    return [*stat_key, today.year, today.isoformat() if uses_today else None, file, identity]
+
+
+# Export the tasks under [task_dirs] to the iCalendar file [output]
+# [display_path] gives the path of a task file as displayed by 'today' (see CliArgs.display_path),
+# and [file_identity] its identity in task fingerprints (see CliArgs.file_identity)
+def export_ics(
+    task_dirs: Sequence[Path],
+    today: date,
+    output: Path,
+    display_path: Callable[[Path], str],
+    file_identity: Callable[[Path], str],
+) -> ExportResult:
+    fragments: List[str] = []
+    rendered = 0
+    cached_count = 0
+    output_cache: Optional[Dict] = None
+    for task_dir in task_dirs:
+        cache_path = ics_cache_path(task_dir)
+        try:
+            cache: Dict[str, Dict] = json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            cache = {}
+        if output_cache is None:
+            output_cache = cache.get("output", {})
+        files: Dict[str, Dict] = cache.get("files", {})
+
+        results: Dict[str, Dict] = {}
+        for file in sorted(iter_task_files(task_dir)):
+            rel_path = file.relative_to(task_dir).as_posix()
+            stat = file.stat()
+            stat_key = [stat.st_mtime_ns, stat.st_size]
+            shown = display_path(file)
+            identity = file_identity(file)
+            entry = files.get(rel_path)
+            if entry is not None and entry["key"] == fragment_key(stat_key, today, entry["uses_today"], shown, identity):
+                cached_count += 1
+            else:
+                text = file.read_text()
+                diagnostics: List[Diagnostic] = []
+                tasks = parse_task_file(file, today, text=text, diagnostics=diagnostics)
+                uses_today = uses_today_shorthand(text)
+                entry = {
+                    "key": fragment_key(stat_key, today, uses_today, shown, identity),
+                    "uses_today": uses_today,
+                    "fragment": file_fragment(tasks, shown, identity),
+                }
+                rendered += 1
+            results[rel_path] = entry
+            fragments.append(entry["fragment"])
+
+        # Only keep entries for files that still exist
+        if results != files:
+            cache["files"] = results
+            atomic_write_text(cache_path, json.dumps(cache))
+
+    assert output_cache is not None
+
+    def chunks() -> Iterator[str]:
+        yield ics_header
+        yield from fragments
+        yield ics_footer
+
+    digest = hashlib.sha1()
+    for chunk in chunks():
+        digest.update(chunk.encode())
+    try:
+        stat = output.stat()
+        output_stat = [str(output.resolve()), stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        output_stat = None
+    # The output is up to date if we wrote it last, with the same contents
+    if output_stat is not None and output_cache == {"stat": output_stat, "sha1": digest.hexdigest()}:
+        return ExportResult(rendered, cached_count, written=False)
+
+    atomic_write_chunks(output, chunks())
+    stat = output.stat()
+    first_cache_path = ics_cache_path(task_dirs[0])
+    try:
+        first_cache = json.loads(first_cache_path.read_text())
+    except (OSError, ValueError):
+        first_cache = {}
+    first_cache["output"] = {
+        "stat": [str(output.resolve()), stat.st_mtime_ns, stat.st_size],
+        "sha1": digest.hexdigest(),
+    }
+    atomic_write_text(first_cache_path, json.dumps(first_cache))
+    return ExportResult(rendered, cached_count, written=True)
@@ -0,0 +1,70 @@
+import os
+import subprocess
+from pathlib import Path
+from typing import Any, List, Tuple
+
+# Reading the task files as they were at a git revision ('today --at <rev>'), without touching the working tree
+# The task files are listed with a single 'git ls-tree', and their contents are read through one
+# long-lived 'git cat-file --batch' process instead of running git once per file.
+
+
+# The Markdown files under [task_dir] at [rev], as (path relative to [task_dir], blob SHA) pairs
+def list_task_blobs(task_dir: Path, rev: str) -> List[Tuple[str, str]]:
+    if rev.startswith("-"):
+        raise ValueError(f"Invalid git revision {rev}")
+    # From a subdirectory of the repository, ls-tree lists paths relative to that subdirectory
+    try:
+        result = subprocess.run(
+            ["git", "ls-tree", "-r", "-z", rev, "--", "."], cwd=task_dir, capture_output=True
+        )
+    except FileNotFoundError:
+        raise ValueError("Reading the task files at a git revision (--at) needs git to be installed")
+    if result.returncode != 0:
+        raise ValueError(
+            f"Couldn't read the task files in {task_dir} at revision {rev}: {result.stderr.decode().strip()}"
+        )
+    blobs: List[Tuple[str, str]] = []
+    for entry in result.stdout.split(b"\0"):
+        if len(entry) == 0:
+            continue
+        info, path = entry.split(b"\t", 1)
+        mode, object_type, sha = info.split(b" ")
+        # Symlinks are stored as blobs that contain the link target, skip them
+        if object_type == b"blob" and mode != b"120000" and path.endswith(b".md"):
+            blobs.append((os.fsdecode(path), sha.decode()))
+    return blobs
+
+
+# Reads blobs by SHA from a single 'git cat-file --batch' process
+class BlobReader:
+    def __init__(self, repo_dir: Path) -> None:
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, sha: str) -> bytes:
+        assert self.process.stdin is not None and self.process.stdout is not None
+        self.process.stdin.write(f"{sha}\n".encode())
+        self.process.stdin.flush()
+        # Each reply is '<sha> <type> <size>\n<contents>\n', or '<sha> missing\n'
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            raise ValueError(f"Couldn't read the git blob {sha}")
+        contents = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)
+        return contents
+
+    def close(self) -> None:
+        assert self.process.stdin is not None and self.process.stdout is not None
+        self.process.stdin.close()
+        self.process.wait()
+        self.process.stdout.close()
+
+    def __enter__(self) -> "BlobReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
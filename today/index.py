@@ -0,0 +1,290 @@
+import hashlib
+import json
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from today.task import (
+    AssignmentAttribute,
+    DateAttribute,
+    EstimateAttribute,
+    PriorityAttribute,
+    Task,
+    TaskAttributes,
+)
+from today.parser import Diagnostic, find_task_files, parse_task_file
+from today.cache import cache_dir, make_cache_dirs
+
+# An optional SQLite mirror of the parsed task files, kept in [task_dir]/.today/index.sqlite
+# The Markdown task files are still the source of truth: the index is synced from them
+# before it is read, and can be deleted and rebuilt at any time.
+# The database is in WAL mode, so readers never block each other (or the writer during a sync).
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    parsed_on TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS headings (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    UNIQUE (file_id, path)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    heading_id INTEGER NOT NULL REFERENCES headings(id) ON DELETE CASCADE,
+    parent_id INTEGER REFERENCES tasks(id) ON DELETE CASCADE,
+    root_id INTEGER NOT NULL,
+    line_number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    done INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    created_date TEXT,
+    due_date TEXT,
+    reminder_date TEXT,
+    finished_date TEXT,
+    priority INTEGER,
+    assignee TEXT,
+    estimate_minutes INTEGER
+);
+CREATE TABLE IF NOT EXISTS diagnostics (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line_number INTEGER NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks(due_date);
+CREATE INDEX IF NOT EXISTS tasks_reminder_date ON tasks(reminder_date);
+CREATE INDEX IF NOT EXISTS tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS tasks_assignee ON tasks(assignee);
+CREATE INDEX IF NOT EXISTS tasks_root_id ON tasks(root_id);
+CREATE INDEX IF NOT EXISTS tasks_file_id ON tasks(file_id);
+"""
+# Bump when the schema (or what is stored in it) changes, indexes with another version are dropped and
+# rebuilt from the task files
+schema_version = 2
+
+
+def index_path(task_dir: Path) -> Path:
+    return cache_dir(task_dir) / "index.sqlite"
+
+
+def connect(task_dir: Path) -> sqlite3.Connection:
+    db = index_path(task_dir)
+    make_cache_dirs(db.parent)
+    conn = sqlite3.connect(db, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version != schema_version:
+        with conn:
+            for table in ["diagnostics", "tasks", "headings", "files"]:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {schema_version}")
+    conn.executescript(schema)
+    return conn
+
+
+def date_str(d: Optional[date]) -> Optional[str]:
+    return d.isoformat() if d else None
+
+
+def str_date(s: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(s) if s else None
+
+
+def insert_tasks(
+    conn: sqlite3.Connection,
+    file_id: int,
+    tasks: List[Task],
+    parent_id: Optional[int],
+    root_id: Optional[int],
+) -> None:
+    for task in tasks:
+        heading = json.dumps(task.path)
+        conn.execute(
+            "INSERT OR IGNORE INTO headings (file_id, path) VALUES (?, ?)",
+            (file_id, heading),
+        )
+        (heading_id,) = conn.execute(
+            "SELECT id FROM headings WHERE file_id = ? AND path = ?",
+            (file_id, heading),
+        ).fetchone()
+        date_attr = task.attrs.date_attr
+        cursor = conn.execute(
+            "INSERT INTO tasks (file_id, heading_id, parent_id, root_id, line_number, title, done, description,"
+            " created_date, due_date, reminder_date, finished_date, priority, assignee, estimate_minutes)"
+            " VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                file_id,
+                heading_id,
+                parent_id,
+                task.line_number,
+                task.title,
+                int(task.done),
+                task.description,
+                date_str(date_attr.created_date),
+                date_str(date_attr.due_date),
+                date_str(date_attr.reminder_date),
+                date_str(date_attr.finished_date),
+                task.attrs.priority_attr.priority if task.attrs.priority_attr else None,
+                task.attrs.assn_attr.assigned_to if task.attrs.assn_attr else None,
+                task.attrs.estimate_attr.minutes if task.attrs.estimate_attr else None,
+            ),
+        )
+        task_id = cursor.lastrowid
+        assert task_id is not None
+        task_root_id = root_id if root_id is not None else task_id
+        conn.execute("UPDATE tasks SET root_id = ? WHERE id = ?", (task_root_id, task_id))
+        insert_tasks(conn, file_id, task.subtasks, task_id, task_root_id)
+
+
+# Bring the index up to date with the task files in [task_dir]
+# Files whose mtime and size are unchanged are skipped, and files whose contents hash is unchanged
+# are not re-parsed. Dates like [d:t] depend on [today], so files parsed on another day are re-parsed.
+# Returns the number of files that were (re-)parsed.
+def sync_index(conn: sqlite3.Connection, task_dir: Path, today: date) -> int:
+    indexed: Dict[str, Tuple[int, int, int, str, str]] = {
+        row[1]: (row[0], row[2], row[3], row[4], row[5])
+        for row in conn.execute(
+            "SELECT id, path, mtime_ns, size, hash, parsed_on FROM files"
+        )
+    }
+    parsed = 0
+    seen = set()
+    with conn:
+        for file in find_task_files(task_dir):
+            rel_path = file.relative_to(task_dir).as_posix()
+            seen.add(rel_path)
+            stat = file.stat()
+            row = indexed.get(rel_path)
+            if (
+                row is not None
+                and row[1] == stat.st_mtime_ns
+                and row[2] == stat.st_size
+                and row[4] == today.isoformat()
+            ):
+                continue
+            contents = file.read_bytes()
+            file_hash = hashlib.sha1(contents).hexdigest()
+            if row is not None and row[3] == file_hash and row[4] == today.isoformat():
+                conn.execute(
+                    "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                    (stat.st_mtime_ns, stat.st_size, row[0]),
+                )
+                continue
+
+            diagnostics: List[Diagnostic] = []
+            tasks = parse_task_file(file, today, contents.decode(), diagnostics)
+            conn.execute(
+                "INSERT INTO files (path, mtime_ns, size, hash, parsed_on) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size,"
+                " hash = excluded.hash, parsed_on = excluded.parsed_on",
+                (rel_path, stat.st_mtime_ns, stat.st_size, file_hash, today.isoformat()),
+            )
+            (file_id,) = conn.execute(
+                "SELECT id FROM files WHERE path = ?", (rel_path,)
+            ).fetchone()
+            conn.execute("DELETE FROM tasks WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM headings WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM diagnostics WHERE file_id = ?", (file_id,))
+            insert_tasks(conn, file_id, tasks, None, None)
+            conn.executemany(
+                "INSERT INTO diagnostics (file_id, line_number, message) VALUES (?, ?, ?)",
+                [(file_id, d.line_number, d.message) for d in diagnostics],
+            )
+            parsed += 1
+
+        for rel_path in indexed.keys() - seen:
+            conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+    return parsed
+
+
+# Delete the index and build it again from scratch
+def rebuild_index(task_dir: Path, today: date) -> int:
+    db = index_path(task_dir)
+    for suffix in ["", "-wal", "-shm"]:
+        Path(str(db) + suffix).unlink(missing_ok=True)
+    conn = connect(task_dir)
+    try:
+        return sync_index(conn, task_dir, today)
+    finally:
+        conn.close()
+
+
+# Rebuild the top-level tasks (and their subtasks) from the rows of the [tasks] table
+# whose root task is in the result of the [roots_query]
+def load_task_trees(
+    conn: sqlite3.Connection, task_dir: Path, roots_query: str, params: Tuple
+) -> List[Task]:
+    rows = conn.execute(
+        "SELECT t.id, t.parent_id, f.path, h.path, t.line_number, t.title, t.done, t.description,"
+        " t.created_date, t.due_date, t.reminder_date, t.finished_date, t.priority, t.assignee,"
+        " t.estimate_minutes FROM tasks t JOIN files f ON t.file_id = f.id JOIN headings h ON t.heading_id = h.id"
+        f" WHERE t.root_id IN ({roots_query}) ORDER BY t.id",
+        params,
+    )
+    tasks_by_id: Dict[int, Task] = {}
+    roots: List[Task] = []
+    for row in rows:
+        (task_id, parent_id, rel_path, heading, line_number, title, done, description) = row[:8]
+        (created, due, reminder, finished, priority, assignee, estimate) = row[8:]
+        task = Task(
+            path=json.loads(heading),
+            title=title,
+            done=bool(done),
+            description=description,
+            attrs=TaskAttributes(
+                date_attr=DateAttribute(
+                    created_date=str_date(created),
+                    due_date=str_date(due),
+                    reminder_date=str_date(reminder),
+                    finished_date=str_date(finished),
+                ),
+                assn_attr=AssignmentAttribute(assignee) if assignee is not None else None,
+                priority_attr=PriorityAttribute(priority) if priority is not None else None,
+                estimate_attr=EstimateAttribute(estimate) if estimate is not None else None,
+            ),
+            file_path=task_dir / rel_path,
+            line_number=line_number,
+        )
+        tasks_by_id[task_id] = task
+        if parent_id is None:
+            roots.append(task)
+        else:
+            tasks_by_id[parent_id].subtasks.append(task)
+    return roots
+
+
+# Top-level tasks that are displayed on [date_filter] (and are assigned to [assignee], if given)
+# The due/reminder date indexes narrow the candidates down, then is_displayed() has the final say
+def visible_tasks(
+    conn: sqlite3.Connection, task_dir: Path, date_filter: date, assignee: Optional[str] = None
+) -> List[Task]:
+    roots_query = (
+        "SELECT root_id FROM tasks WHERE done = 0 AND due_date <= ?"
+        " UNION SELECT root_id FROM tasks WHERE done = 0 AND reminder_date <= ?"
+    )
+    params: Tuple = (date_filter.isoformat(), date_filter.isoformat())
+    if assignee is not None:
+        roots_query = f"SELECT root_id FROM tasks WHERE assignee = ? INTERSECT SELECT * FROM ({roots_query})"
+        params = (assignee,) + params
+    candidates = load_task_trees(conn, task_dir, roots_query, params)
+    return [task for task in candidates if task.is_displayed(date_filter)]
+
+
+# The problems found when the task files were parsed into the index
+def file_diagnostics(conn: sqlite3.Connection, task_dir: Path) -> List[Diagnostic]:
+    return [
+        Diagnostic(line_number, message, task_dir / rel_path)
+        for rel_path, line_number, message in conn.execute(
+            "SELECT f.path, d.line_number, d.message FROM diagnostics d JOIN files f ON d.file_id = f.id"
+            " ORDER BY f.path, d.line_number"
+        )
+    ]
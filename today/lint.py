@@ -0,0 +1,88 @@
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from today.parser import Diagnostic, iter_task_files, parse_markdown
+from today.cache import cache_dir, atomic_write_text
+
+# 'today lint': check every task file for problems, in parallel
+# The diagnostics of each file are cached in [task_dir]/.today/lint.json, keyed by the hash of
+# the file contents, so only files that changed since the last run are checked again.
+
+# Below this many files to check, starting worker processes costs more than it saves
+parallel_threshold = 32
+
+
+def lint_cache_path(task_dir: Path) -> Path:
+    return cache_dir(task_dir) / "lint.json"
+
+
+# Dates without a year (e.g. [d:2/29]) depend on the current year, so it is part of the cache key
+def lint_key(contents: bytes, today: date) -> str:
+    return f"{hashlib.sha1(contents).hexdigest()}-{today.year}"
+
+
+def lint_text(text: str, today: date) -> List[Tuple[int, str]]:
+    diagnostics: List[Diagnostic] = []
+    parse_markdown(text.split("\n"), today=today, diagnostics=diagnostics)
+    return [(d.line_number, d.message) for d in diagnostics]
+
+
+@dataclass
+class LintResult:
+    diagnostics: List[Diagnostic]
+    files_checked: int
+    files_cached: int
+
+
+def lint(task_dir: Path, today: date) -> LintResult:
+    cache_path = lint_cache_path(task_dir)
+    try:
+        cache: Dict[str, Dict] = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cache = {}
+
+    results: Dict[str, List[Tuple[int, str]]] = {}
+    keys: Dict[str, str] = {}
+    to_check: Dict[str, str] = {}
+    for file in iter_task_files(task_dir):
+        rel_path = file.relative_to(task_dir).as_posix()
+        contents = file.read_bytes()
+        keys[rel_path] = lint_key(contents, today)
+        cached = cache.get(rel_path)
+        if cached is not None and cached["key"] == keys[rel_path]:
+            results[rel_path] = [(line, message) for line, message in cached["diagnostics"]]
+        else:
+            to_check[rel_path] = contents.decode()
+
+    if len(to_check) >= parallel_threshold:
+        with ProcessPoolExecutor() as pool:
+            checked = pool.map(
+                lint_text, to_check.values(), [today] * len(to_check), chunksize=8
+            )
+            results.update(zip(to_check.keys(), checked))
+    else:
+        results.update((rel_path, lint_text(text, today)) for rel_path, text in to_check.items())
+
+    # Only keep entries for files that still exist
+    if len(to_check) > 0 or cache.keys() != results.keys():
+        atomic_write_text(
+            cache_path,
+            json.dumps(
+                {
+                    rel_path: {"key": keys[rel_path], "diagnostics": results[rel_path]}
+                    for rel_path in sorted(results)
+                }
+            ),
+        )
+
+    diagnostics = [
+        Diagnostic(line, message, task_dir / rel_path)
+        for rel_path in sorted(results)
+        for line, message in results[rel_path]
+    ]
+    return LintResult(diagnostics, len(to_check), len(results) - len(to_check))
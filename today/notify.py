@@ -0,0 +1,112 @@
+import os
+import signal
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from today.cache import atomic_write_text
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+# Notifiers publish the current task snippet (written by 'start') to a status bar
+# The snippet file is replaced atomically so the status bar never reads a partial snippet,
+# and the write + refresh happens under a lock so overlapping 'start' calls don't interleave.
+
+
+@contextmanager
+def file_lock(lock_file: Path) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    with lock_file.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Notifier:
+    def __init__(self, task_file: Path) -> None:
+        self.task_file = task_file
+
+    def notify(self, snippet: str) -> None:
+        with file_lock(self.task_file.with_name(self.task_file.name + ".lock")):
+            atomic_write_text(self.task_file, snippet)
+            self.refresh()
+
+    # Tell the status bar that the task file has changed
+    def refresh(self) -> None:
+        pass
+
+
+# https://i3wm.org/docs/i3status.html
+# i3status re-reads its modules when it receives SIGUSR1
+class I3StatusNotifier(Notifier):
+    process_name = "i3status"
+
+    def __init__(self, task_file: Path, proc_dir: Path = Path("/proc")) -> None:
+        super().__init__(task_file)
+        self.proc_dir = proc_dir
+        self.pid_cache = task_file.with_name(task_file.name + ".i3status.pid")
+
+    def is_i3status(self, pid: int) -> bool:
+        try:
+            return (self.proc_dir / str(pid) / "comm").read_text().strip() == self.process_name
+        except OSError:
+            return False
+
+    def find_pids(self) -> List[int]:
+        return [
+            int(entry.name)
+            for entry in self.proc_dir.iterdir()
+            if entry.name.isdigit() and self.is_i3status(int(entry.name))
+        ]
+
+    # The PIDs of the running i3status processes, or None if they can't be looked up (no /proc)
+    # The cached PIDs are checked again since i3status may have restarted and its PID been reused
+    def pids(self) -> Optional[List[int]]:
+        if not self.proc_dir.is_dir():
+            return None
+        try:
+            cached = [int(pid) for pid in self.pid_cache.read_text().split()]
+        except (OSError, ValueError):
+            cached = []
+        if len(cached) > 0 and all(self.is_i3status(pid) for pid in cached):
+            return cached
+        pids = self.find_pids()
+        atomic_write_text(self.pid_cache, " ".join(str(pid) for pid in pids))
+        return pids
+
+    def refresh(self) -> None:
+        pids = self.pids()
+        if pids is not None:
+            try:
+                for pid in pids:
+                    os.kill(pid, signal.SIGUSR1)
+                return
+            except (ProcessLookupError, PermissionError):
+                pass
+        subprocess.run(["killall", "-USR1", self.process_name])
+
+
+# https://github.com/swiftbar/SwiftBar#url-scheme
+class SwiftBarNotifier(Notifier):
+    plugin_name = "today.1m.sh"
+
+    def refresh(self) -> None:
+        subprocess.run(
+            ["open", "-g", f"swiftbar://refreshplugin?name={self.plugin_name}"]
+        )
+
+
+def default_notifier(task_file: Path) -> Notifier:
+    if sys.platform.startswith("darwin"):
+        return SwiftBarNotifier(task_file)
+    else:
+        return I3StatusNotifier(task_file)
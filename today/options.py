@@ -0,0 +1,57 @@
+import os
+from datetime import date
+from pathlib import Path
+from typing import List, Optional
+
+# Command line helpers that don't need rich, shared by the CLI and 'today-complete'
+
+
+# Parse a month/day/year date given on the command line
+def parse_date(s: str) -> date:
+    date_split = s.split("/")
+    return date(int(date_split[2]), int(date_split[0]), int(date_split[1]))
+
+
+def default_config_path() -> Path:
+    config_home = os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    return Path(config_home) / "today" / "roots"
+
+
+# Read the task directories listed in a roots config file
+# Blank lines and lines starting with '#' are skipped, relative paths are relative to the config file
+def read_roots_config(config: Path) -> List[str]:
+    roots: List[str] = []
+    for line in config.read_text().split("\n"):
+        line = line.strip()
+        if len(line) == 0 or line.startswith("#"):
+            continue
+        roots.append(str(config.parent / Path(line).expanduser()))
+    return roots
+
+
+# The task directories to use given the --dir arguments (if any) and --config file (if any)
+# Without either, they are read from the default roots config file, or the current directory is used
+def find_task_dirs(dir_args: Optional[List[str]], config: Optional[str]) -> List[Path]:
+    dirs: List[str]
+    if dir_args:
+        dirs = dir_args
+    elif config:
+        dirs = read_roots_config(Path(config))
+    elif default_config_path().is_file():
+        dirs = read_roots_config(default_config_path())
+    else:
+        dirs = []
+
+    task_dirs: List[Path] = []
+    for d in dirs:
+        task_dir = Path(d).resolve()
+        if not task_dir.is_dir():
+            raise ValueError(f"Provided --dir {d} is not a directory")
+        # A directory inside another one is already searched as part of it, its tasks would be listed twice
+        if any(task_dir == d or d in task_dir.parents for d in task_dirs):
+            continue
+        task_dirs = [d for d in task_dirs if task_dir not in d.parents]
+        task_dirs.append(task_dir)
+    if len(task_dirs) == 0:
+        task_dirs = [Path.cwd().resolve()]
+    return task_dirs
@@ -0,0 +1,47 @@
+import hashlib
+from datetime import date
+from pathlib import Path
+from typing import Optional, Sequence
+
+from today.parser import iter_task_files
+from today.cache import cache_dir, atomic_write_text
+
+# 'today --cache-output': reuse the last output of 'today' when nothing it depends on has changed
+# Status bars (SwiftBar, i3blocks) run 'today' every minute, and the task files rarely change in between.
+# The output is kept in [task_dir]/.today/output/, one file per set of command line options, along with a
+# fingerprint of the stat() of every task file (creating, deleting or editing one invalidates it) and
+# the effective date (so it is invalidated at midnight).
+# A cache hit costs a stat() of each task file and reading one file, without parsing or rendering.
+
+
+# [options] are everything else the output depends on: the task directories, lookahead, task id,
+# terminal width, colors...
+def output_path(task_dir: Path, options: Sequence[str]) -> Path:
+    name = hashlib.sha1("\0".join(options).encode()).hexdigest()[:16]
+    return cache_dir(task_dir) / "output" / name
+
+
+def fingerprint(task_dirs: Sequence[Path], today: date, options: Sequence[str]) -> str:
+    h = hashlib.sha1()
+    h.update("\0".join([today.isoformat(), *options]).encode())
+    for task_dir in task_dirs:
+        for file in sorted(iter_task_files(task_dir)):
+            try:
+                stat = file.stat()
+            except OSError:  # the file was deleted during the walk
+                continue
+            h.update(f"\n{file}\0{stat.st_mtime_ns}\0{stat.st_ctime_ns}\0{stat.st_size}".encode())
+    return h.hexdigest()
+
+
+# The stored output, if it was rendered from inputs with the same [key] fingerprint
+def load(path: Path, key: str) -> Optional[str]:
+    try:
+        stored_key, output = path.read_text().split("\n", 1)
+    except (OSError, ValueError):
+        return None
+    return output if stored_key == key else None
+
+
+def store(path: Path, key: str, output: str) -> None:
+    atomic_write_text(path, f"{key}\n{output}")
@@ -1,10 +1,13 @@
-from typing import Sequence, Tuple, List, Optional, Union
+from typing import Callable, Iterator, Sequence, Tuple, List, Optional, Union
+from dataclasses import dataclass
 from datetime import date
+from pathlib import Path
 import re
 from more_itertools import windowed
 
 from today.task import (
     AssignmentAttribute,
+    EstimateAttribute,
     PriorityAttribute,
     Task,
     Heading,
@@ -12,9 +15,31 @@ from today.task import (
     TaskTitle,
 )
 
+# A problem found while parsing a task file, parsing skips over it and keeps going
+@dataclass
+class Diagnostic:
+    line_number: int
+    message: str
+    file_path: Optional[Path] = None
+
+
 task_attr_re = re.compile(r"\[(?P<prefix>(.:|@|!))(?P<value>.*?)\]\s?")
 task_re = re.compile(r"^- \[[ xX]\] ")
 subtask_re = re.compile(r"^[ \t]+- \[[ xX]\] ")
+today_shorthand_re = re.compile(r"\[.:t\]")
+duration_re = re.compile(r"((?P<hours>\d+(\.\d+)?)h)?((?P<minutes>\d+)m)?")
+
+
+# Fetch the Markdown task files under [task_dir], one at a time
+def iter_task_files(task_dir: Path) -> Iterator[Path]:
+    for file in task_dir.glob("**/*.md"):
+        # Filter out broken symlinks (symlinks that don't exist)
+        if not (file.is_symlink() and not file.exists()):
+            yield file
+
+
+def find_task_files(task_dir: Path) -> List[Path]:
+    return list(iter_task_files(task_dir))
 
 
 def parse_heading(s: str) -> Heading:
@@ -45,6 +70,19 @@ def handle_headings_stack(headings_stack: List[str], heading_raw: str) -> List[s
     return headings_stack
 
 
+# The width of the leading whitespace of [line] (a tab counts as 4 spaces)
+def indent_width(line: str) -> int:
+    width = 0
+    for c in line:
+        if c == " ":
+            width += 1
+        elif c == "\t":
+            width += 4
+        else:
+            break
+    return width
+
+
 def md_checkbox(s: str) -> Optional[bool]:
     # None = not a checkbox, True = checked, False = unchecked
     if s.startswith("[ ]"):
@@ -55,8 +93,22 @@ def md_checkbox(s: str) -> Optional[bool]:
         return None
 
 
+# Whether [text] has dates written as 't' (e.g. [d:t]), which resolve to the date the file is parsed on
+def uses_today_shorthand(text: str) -> bool:
+    return today_shorthand_re.search(text) is not None
+
+
+# A duration like '2h', '45m', '1h30m' or '1.5h', in minutes
+def parse_duration(s: str) -> int:
+    match = duration_re.fullmatch(s.strip())
+    if match is None or not (match.group("hours") or match.group("minutes")):
+        raise ValueError(f"Duration '{s}' should look like 2h, 45m, or 1h30m")
+    hours = float(match.group("hours") or 0)
+    return round(hours * 60) + int(match.group("minutes") or 0)
+
+
 # Mutates the fields of [task_attr] based on a raw attribute string (prefix + value)
-# of the form [d:<date>] (prefix='d:', value='<date>') or [@person] or [!2]
+# of the form [d:<date>] (prefix='d:', value='<date>') or [@person] or [!2] or [e:2h]
 # If the prefix or value are malformed, return an error message
 def assign_task_attr(
     prefix: str, value: str, task_attr: TaskAttributes, today: date
@@ -69,6 +121,10 @@ def assign_task_attr(
         # This is a priority attribute
         task_attr.priority_attr = PriorityAttribute(int(value))
         return
+    elif prefix == "e:":
+        # This is an estimate attribute
+        task_attr.estimate_attr = EstimateAttribute(parse_duration(value))
+        return
     else:
         # This must be a date attribute
         prefix = prefix[0]  # the raw prefix passed is of the form 'd:'
@@ -101,8 +157,10 @@ def assign_task_attr(
         return
 
 
+# If an [errors] list is given, malformed attributes are skipped and their errors are appended to it,
+# otherwise a RuntimeError is raised
 def extract_task_attrs(
-    raw_task_title: str, today: date
+    raw_task_title: str, today: date, errors: Optional[List[str]] = None
 ) -> Tuple[TaskAttributes, TaskTitle]:
     task_attr = TaskAttributes()
 
@@ -114,11 +172,16 @@ def extract_task_attrs(
     for match in task_attr_matches:
         prefix = match.group("prefix")
         value = match.group("value")
-        error_msg = assign_task_attr(prefix, value, task_attr, today)
+        try:
+            error_msg = assign_task_attr(prefix, value, task_attr, today)
+        except ValueError as e:  # e.g. a non-numeric priority or a day that doesn't exist
+            error_msg = f"Attribute '{match.group(0).strip()}' is malformed ({e})"
         if error_msg is not None:
-            raise RuntimeError(
-                f"An error was encountered when parsing the task title '{raw_task_title}'. Error: {error_msg}"
-            )
+            if errors is None:
+                raise RuntimeError(
+                    f"An error was encountered when parsing the task title '{raw_task_title}'. Error: {error_msg}"
+                )
+            errors.append(error_msg)
 
     # Strip all the task attribute matches from the [raw_task_title]
     # Do this efficiently by first computing the substring indices we need, then constructing the new string
@@ -138,19 +201,77 @@ def extract_task_attrs(
     return task_attr, task_title.rstrip()
 
 
-def parse_task_title(title: str, today: date) -> Task:
-    task_attr, task_title = extract_task_attrs(title, today)
+def parse_task_title(title: str, today: date, errors: Optional[List[str]] = None) -> Task:
+    task_attr, task_title = extract_task_attrs(title, today, errors)
     t = Task(title=task_title, attrs=task_attr)
     return t
 
 
-def parse_markdown(md: Sequence[str], today: date = date.today()) -> List[Task]:
+# Validate that if a task has no dates but has subtasks with dates, we report an error
+def check_subtask_dates(task: Task, report: Callable[[int, str], None]) -> None:
+    has_no_dates = not task.attrs.date_attr.due_date and not task.attrs.date_attr.reminder_date
+    if has_no_dates and any(
+        subtask.attrs.date_attr.due_date or subtask.attrs.date_attr.reminder_date
+        for subtask in task.subtasks
+    ):
+        report(
+            task.line_number,
+            f"Subtask has a due date or reminder date, but parent task '{task.title}' does not. "
+            "Please add a due date or reminder date to the parent task, or remove dates from its subtasks.",
+        )
+    for subtask in task.subtasks:
+        check_subtask_dates(subtask, report)
+
+
+# If a [diagnostics] list is given, problems in the Markdown are appended to it and parsing keeps going,
+# otherwise the first problem raises an exception
+def parse_markdown(
+    md: Sequence[str],
+    today: date = date.today(),
+    diagnostics: Optional[List[Diagnostic]] = None,
+) -> List[Task]:
+    def report(line_number: int, message: str) -> None:
+        if diagnostics is None:
+            raise ValueError(f"Line {line_number}: {message}")
+        diagnostics.append(Diagnostic(line_number, message))
+
+    # Malformed task attributes are reported, the rest of the task is still parsed
+    def parse_title(title: str, line_number: int) -> Task:
+        if diagnostics is None:
+            return parse_task_title(title, today)
+        errors: List[str] = []
+        task = parse_task_title(title, today, errors)
+        for error in errors:
+            report(line_number, error)
+        return task
+
+    first_diagnostic = len(diagnostics) if diagnostics is not None else 0
     headings_stack: List[str] = []
+    # The level each heading in [headings_stack] was written with, which differs from its depth in the
+    # stack after a heading that is nested too deep
+    heading_levels: List[int] = []
     current_task: Optional[Task] = None
+    # The chain of subtasks (indentation, subtask) leading to the most recently parsed subtask
+    subtasks_stack: List[Tuple[int, Task]] = []
     tasks: List[Task] = []
     for i, line in enumerate(md):
         if line.startswith("#"):  # This is a heading
-            headings_stack = handle_headings_stack(headings_stack, line)
+            try:
+                heading = parse_heading(line)
+            except ValueError as e:  # Not a heading after all (e.g. '#tag'), keep it as description text
+                report(i + 1, str(e))
+                if current_task is not None:
+                    current_task.description = current_task.description + "\n" + line
+                continue
+            # Like handle_headings_stack, but by written level: a heading that is nested too deep is nested
+            # one level below the current heading, and its later siblings are nested at the same depth
+            while len(heading_levels) > 0 and heading_levels[-1] >= heading.level:
+                heading_levels.pop()
+                headings_stack.pop()
+            if heading.level > (heading_levels[-1] if len(heading_levels) > 0 else 0) + 1:
+                report(i + 1, f"Heading {heading} nested too deep")
+            heading_levels.append(heading.level)
+            headings_stack.append(heading.name)
             # Headings terminate any task already being parsed
             if current_task is not None:
                 tasks.append(current_task)
@@ -160,25 +281,32 @@ def parse_markdown(md: Sequence[str], today: date = date.today()) -> List[Task]:
             if task_status is not None:
                 if current_task is not None:
                     tasks.append(current_task)
-                current_task = parse_task_title(line[len("- [ ] ") :], today)
+                current_task = parse_title(line[len("- [ ] ") :], i + 1)
                 current_task.path = headings_stack.copy()
                 current_task.done = task_status
                 current_task.line_number = i + 1
+                subtasks_stack = []
             else:  # Malformed Markdown checkbox
-                raise ValueError(f"Malformed Markdown checkbox on line {i}: {line}")
+                report(i + 1, f"Malformed Markdown checkbox: {line}")
         elif (match := subtask_re.match(line)) is not None:
             if current_task is None:
-                raise ValueError(
-                    f"Encountered subtask without a main task on line {i}: {line}"
-                )
+                report(i + 1, f"Encountered subtask without a main task: {line}")
+                continue
             subtask_status = md_checkbox(line[line.index("[") :])
             assert subtask_status is not None  # The checkbox must not be malformed
-            subtask = parse_task_title(line[match.end(0) :], today)
+            subtask = parse_title(line[match.end(0) :], i + 1)
             subtask.path = headings_stack.copy()
             subtask.done = subtask_status
             subtask.line_number = i + 1
-            subtask.attrs.merge_attributes(current_task.attrs)
-            current_task.subtasks.append(subtask)
+            # The parent is the closest preceding subtask that is indented less than this one,
+            # or the main task if there is none
+            indent = indent_width(line)
+            while len(subtasks_stack) > 0 and subtasks_stack[-1][0] >= indent:
+                subtasks_stack.pop()
+            parent = subtasks_stack[-1][1] if len(subtasks_stack) > 0 else current_task
+            subtask.attrs.merge_attributes(parent.attrs)
+            parent.subtasks.append(subtask)
+            subtasks_stack.append((indent, subtask))
         elif len(line) == 0 and current_task is None:
             continue
         else:
@@ -195,4 +323,35 @@ def parse_markdown(md: Sequence[str], today: date = date.today()) -> List[Task]:
     # Post-process descriptions - remove trailing or leading newlines and spaces
     for i in range(len(tasks)):
         tasks[i].description = tasks[i].description.strip("\n ")
+        check_subtask_dates(tasks[i], report)
+    if diagnostics is not None:
+        diagnostics[first_diagnostic:] = sorted(
+            diagnostics[first_diagnostic:], key=lambda d: d.line_number
+        )
+    return tasks
+
+
+# Parse the Markdown task file at [path], recording the file path in every task and subtask
+# Problems in the file are appended to [diagnostics] (if given) instead of raising an exception
+def parse_task_file(
+    path: Path,
+    today: date,
+    text: Optional[str] = None,
+    diagnostics: Optional[List[Diagnostic]] = None,
+) -> List[Task]:
+    if text is None:
+        text = path.read_text()
+    file_diagnostics: Optional[List[Diagnostic]] = None if diagnostics is None else []
+    tasks = parse_markdown(text.split("\n"), today=today, diagnostics=file_diagnostics)
+    if diagnostics is not None and file_diagnostics is not None:
+        for diagnostic in file_diagnostics:
+            diagnostic.file_path = path
+        diagnostics.extend(file_diagnostics)
+
+    def set_file_path(tasks: List[Task]) -> None:
+        for task in tasks:
+            task.file_path = path
+            set_file_path(task.subtasks)
+
+    set_file_path(tasks)
     return tasks
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+from today.task import Task
+
+# 'today plan --budget 6h': pick the visible tasks that make the most of the time available
+# Each task with an estimate ([e:2h]) is worth more the higher its priority, the longer it has been overdue,
+# and the sooner it is due. The most valuable set of tasks that fits in the budget is found exactly with
+# a 0/1 knapsack over the budget in 5 minute steps, in O(tasks * budget steps) time.
+# Among equally valuable plans, tasks that come first in the 'today' listing (task_sorter order) win.
+
+# Estimates are rounded up to this many minutes
+granularity = 5
+
+
+# The task's estimate, or the sum of the estimates of its open subtasks if it doesn't have one
+def task_estimate(task: Task) -> Optional[int]:
+    if task.attrs.estimate_attr is not None:
+        return task.attrs.estimate_attr.minutes
+    estimates = [task_estimate(t) for t in task.subtasks if not t.done]
+    known = [e for e in estimates if e is not None]
+    return sum(known) if len(known) > 0 else None
+
+
+# The earliest due date of the task and its open subtasks
+def earliest_due_date(task: Task) -> Optional[date]:
+    dates = [task.attrs.date_attr.due_date] + [
+        earliest_due_date(t) for t in task.subtasks if not t.done
+    ]
+    known = [d for d in dates if d is not None]
+    return min(known) if len(known) > 0 else None
+
+
+def task_value(task: Task, today: date) -> int:
+    value = 1
+    if task.attrs.priority_attr is not None:
+        value += 5 * max(1, 4 - task.attrs.priority_attr.priority)
+    due_date = earliest_due_date(task)
+    if due_date is not None:
+        days_left = (due_date - today).days
+        if days_left < 0:
+            value += 10 + 2 * min(-days_left, 15)
+        else:
+            value += max(0, 7 - days_left)
+    return value
+
+
+@dataclass
+class Plan:
+    # (task id, task) in task id order
+    tasks: List[Tuple[int, Task]]
+    minutes: int
+    # Tasks that can't be planned because they have no estimate
+    unestimated: List[Tuple[int, Task]]
+
+
+# [tasks] are the visible tasks in task id order (as listed by 'today')
+def plan(tasks: Sequence[Task], today: date, budget_minutes: int) -> Plan:
+    candidates: List[Tuple[int, Task, int, int]] = []  # (task id, task, weight in steps, value)
+    unestimated: List[Tuple[int, Task]] = []
+    for i, task in enumerate(tasks):
+        estimate = task_estimate(task)
+        if estimate is None:
+            unestimated.append((i, task))
+        else:
+            candidates.append((i, task, -(-estimate // granularity), task_value(task, today)))
+
+    capacity = budget_minutes // granularity
+    # best[i][w]: the highest total value of tasks from candidates[i:] that fit in w steps
+    best: List[List[int]] = [[0] * (capacity + 1) for _ in range(len(candidates) + 1)]
+    for i in reversed(range(len(candidates))):
+        _, _, weight, value = candidates[i]
+        rest = best[i + 1]
+        if weight <= capacity:
+            best[i] = rest[:weight] + [
+                max(skip, take + value) for skip, take in zip(rest[weight:], rest)
+            ]
+        else:
+            best[i] = rest
+
+    # Walk the tasks in order, taking each one that is part of a best plan for the remaining budget
+    chosen: List[Tuple[int, Task]] = []
+    minutes = 0
+    w = capacity
+    for i, (task_id, task, weight, value) in enumerate(candidates):
+        if weight <= w and best[i][w] == best[i + 1][w - weight] + value:
+            chosen.append((task_id, task))
+            minutes += task_estimate(task) or 0
+            w -= weight
+    return Plan(chosen, minutes, unestimated)
@@ -0,0 +1,142 @@
+import json
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from today.task import Task
+from today.parser import Diagnostic, iter_task_files, parse_task_file, uses_today_shorthand
+from today.cache import cache_dir, atomic_write_text
+
+# 'today projects': how many tasks are open, overdue, due this week, and were done recently,
+# per task file and top-level heading
+# Each task file is summarized into per-heading histograms of due dates (of open tasks) and finished
+# dates (of done tasks), which are cached in [task_dir]/.today/projects.json. Only task files that changed
+# since the last run are parsed again, and the counts for any date are sums over the cached histograms.
+
+
+def projects_cache_path(task_dir: Path) -> Path:
+    return cache_dir(task_dir) / "projects.json"
+
+
+@dataclass
+class HeadingHistogram:
+    open: int = 0
+    # ISO due date -> number of open tasks due on that day
+    due: Dict[str, int] = field(default_factory=dict)
+    # ISO finished date -> number of done tasks finished on that day
+    done: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ProjectCounts:
+    open: int = 0
+    overdue: int = 0
+    due_this_week: int = 0
+    done_recently: int = 0
+
+    def add(self, histogram: HeadingHistogram, today: date) -> None:
+        self.open += histogram.open
+        for due, count in histogram.due.items():
+            due_date = date.fromisoformat(due)
+            if due_date < today:
+                self.overdue += count
+            elif due_date < today + timedelta(days=7):
+                self.due_this_week += count
+        for done, count in histogram.done.items():
+            if today - timedelta(days=30) < date.fromisoformat(done) <= today:
+                self.done_recently += count
+
+
+# The histograms of the tasks in a task file, by heading path
+def file_histograms(tasks: List[Task]) -> Dict[Tuple[str, ...], HeadingHistogram]:
+    histograms: Dict[Tuple[str, ...], HeadingHistogram] = {}
+    for task in tasks:
+        histogram = histograms.setdefault(tuple(task.path), HeadingHistogram())
+        dates = task.attrs.date_attr
+        if not task.done:
+            histogram.open += 1
+            if dates.due_date:
+                due = dates.due_date.isoformat()
+                histogram.due[due] = histogram.due.get(due, 0) + 1
+        elif dates.finished_date:
+            done = dates.finished_date.isoformat()
+            histogram.done[done] = histogram.done.get(done, 0) + 1
+    return histograms
+
+
+# Dates without a year depend on the current year, and files with [d:t] depend on the current date
+def cache_key(stat_key: List[int], today: date, uses_today: bool) -> List:
+    return [*stat_key, today.year, today.isoformat() if uses_today else None]
+
+
+# The heading histograms of every task file under [task_dir], by path relative to [task_dir]
+def project_histograms(
+    task_dir: Path, today: date
+) -> Dict[str, Dict[Tuple[str, ...], HeadingHistogram]]:
+    cache_path = projects_cache_path(task_dir)
+    try:
+        cache: Dict[str, Dict] = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cache = {}
+
+    results: Dict[str, Dict] = {}
+    changed = False
+    for file in iter_task_files(task_dir):
+        rel_path = file.relative_to(task_dir).as_posix()
+        stat = file.stat()
+        stat_key = [stat.st_mtime_ns, stat.st_size]
+        cached = cache.get(rel_path)
+        if cached is not None and cached["key"] == cache_key(stat_key, today, cached["uses_today"]):
+            results[rel_path] = cached
+            continue
+        text = file.read_text()
+        diagnostics: List[Diagnostic] = []
+        tasks = parse_task_file(file, today, text=text, diagnostics=diagnostics)
+        uses_today = uses_today_shorthand(text)
+        results[rel_path] = {
+            "key": cache_key(stat_key, today, uses_today),
+            "uses_today": uses_today,
+            "headings": [
+                [list(path), h.open, h.due, h.done] for path, h in file_histograms(tasks).items()
+            ],
+        }
+        changed = True
+
+    # Only keep entries for files that still exist
+    if changed or cache.keys() != results.keys():
+        atomic_write_text(cache_path, json.dumps({k: results[k] for k in sorted(results)}))
+
+    return {
+        rel_path: {
+            tuple(path): HeadingHistogram(open, due, done)
+            for path, open, due, done in entry["headings"]
+        }
+        for rel_path, entry in sorted(results.items())
+    }
+
+
+@dataclass
+class ProjectRow:
+    file: str
+    heading: Optional[str]  # None for the row of the whole file
+    counts: ProjectCounts
+
+
+# A row per task file, followed by a row per top-level heading of that file (in order of appearance)
+# Tasks under nested headings are counted towards their top-level heading
+def rollup(
+    histograms: Dict[str, Dict[Tuple[str, ...], HeadingHistogram]], today: date
+) -> List[ProjectRow]:
+    rows: List[ProjectRow] = []
+    for file, headings in histograms.items():
+        file_row = ProjectRow(file, None, ProjectCounts())
+        heading_rows: Dict[str, ProjectRow] = {}
+        for path, histogram in headings.items():
+            file_row.counts.add(histogram, today)
+            if len(path) > 0:
+                heading_rows.setdefault(path[0], ProjectRow(file, path[0], ProjectCounts()))
+                heading_rows[path[0]].counts.add(histogram, today)
+        rows.append(file_row)
+        rows.extend(heading_rows.values())
+    return rows
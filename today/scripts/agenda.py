@@ -0,0 +1,24 @@
+import argparse
+import sys
+
+from rich.console import Console
+
+from today.cli import add_common_args, parse_args, iter_tasks, agenda_to_tree
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today agenda")
+    add_common_args(parser)
+    cli_args = parse_args(parser, args)
+    console = Console()
+
+    # Parse all the task files once, then bucket them by day
+    tasks = iter_tasks(cli_args)
+    try:
+        tree = agenda_to_tree(cli_args, tasks)
+        console.print("")
+        console.print(tree)
+        console.print("")
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        sys.exit(1)
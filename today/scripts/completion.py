@@ -0,0 +1,14 @@
+import argparse
+
+from today.completion import scripts
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today completion")
+    parser.add_argument(
+        "shell",
+        choices=sorted(scripts),
+        help="Print the completion script for this shell",
+    )
+    ns = parser.parse_args(args)
+    print(scripts[ns.shell], end="")
@@ -0,0 +1,29 @@
+import argparse
+from pathlib import Path
+
+from rich.console import Console
+
+from today.cli import add_common_args, args_from_namespace
+from today.export import export_ics
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today export")
+    add_common_args(parser)
+    parser.add_argument(
+        "--ics",
+        type=str,
+        required=True,
+        help="Write the due dates (as to-dos) and reminders (as events) of all tasks to this iCalendar file",
+    )
+    ns = parser.parse_args(args)
+    cli_args = args_from_namespace(ns)
+    output = Path(ns.ics)
+
+    result = export_ics(cli_args.task_dirs(), cli_args.today, output, cli_args.display_path, cli_args.file_identity)
+    console = Console()
+    console.print(
+        f"[italic]{'Wrote' if result.written else 'Unchanged'} {output} "
+        f"({result.files_rendered} task files rendered, {result.files_cached} unchanged files were cached)[/italic]",
+        highlight=False,
+    )
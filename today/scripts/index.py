@@ -0,0 +1,34 @@
+import argparse
+
+from today.cli import add_common_args, args_from_namespace
+from today import index, snapshot
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today index")
+    parser.add_argument(
+        "action",
+        choices=["sync", "rebuild", "build"],
+        help="Bring the SQLite task index up to date, delete it and build it from scratch, "
+        "or build the snapshot that 'today' reads the listing from",
+    )
+    add_common_args(parser)
+    ns = parser.parse_args(args)
+    cli_args = args_from_namespace(ns)
+
+    # Each task directory has its own index
+    action = ns.action
+    for task_dir in cli_args.task_dirs():
+        if action == "build":
+            files, tasks = snapshot.build_snapshot(task_dir, cli_args.today)
+            print(f"Wrote {tasks} tasks from {files} task files to {snapshot.snapshot_path(task_dir)}")
+            continue
+        if action == "rebuild":
+            parsed = index.rebuild_index(task_dir, cli_args.today)
+        else:
+            conn = index.connect(task_dir)
+            try:
+                parsed = index.sync_index(conn, task_dir, cli_args.today)
+            finally:
+                conn.close()
+        print(f"Indexed {parsed} task files in {index.index_path(task_dir)}")
@@ -0,0 +1,31 @@
+import argparse
+import sys
+
+from rich.console import Console
+from rich.markup import escape
+
+from today.cli import add_common_args, parse_args, format_diagnostic
+from today.lint import lint
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today lint")
+    add_common_args(parser)
+    cli_args = parse_args(parser, args)
+    console = Console()
+
+    problems = 0
+    for task_dir in cli_args.task_dirs():
+        result = lint(task_dir, cli_args.today)
+        for diagnostic in result.diagnostics:
+            console.print(escape(format_diagnostic(cli_args, diagnostic)), highlight=False)
+        problems += len(result.diagnostics)
+        console.print(
+            f"[italic]{task_dir}: checked {result.files_checked} files "
+            f"({result.files_cached} unchanged files were cached)[/italic]"
+        )
+
+    if problems > 0:
+        console.print(f"[red]Found {problems} problems[/red]")
+        sys.exit(1)
+    console.print("[green]No problems found[/green]")
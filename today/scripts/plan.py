@@ -0,0 +1,51 @@
+import argparse
+import sys
+
+from rich.console import Console
+from rich.tree import Tree
+
+from today.cli import add_common_args, args_from_namespace, parse_task_files, add_tasks_to_tree
+from today.parser import parse_duration
+from today.task import minutes_str
+from today.plan import plan
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today plan")
+    add_common_args(parser)
+    parser.add_argument(
+        "--budget",
+        type=str,
+        required=True,
+        help="The time available for tasks, e.g. --budget 6h or --budget 5h30m",
+    )
+    ns = parser.parse_args(args)
+    cli_args = args_from_namespace(ns)
+    console = Console()
+    try:
+        budget = parse_duration(ns.budget)
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        sys.exit(1)
+
+    try:
+        tasks = parse_task_files(cli_args)
+    except ValueError as e:  # e.g. a revision given with --at that doesn't exist
+        console.print(f"[red]{str(e)}[/red]")
+        sys.exit(1)
+    result = plan(tasks, cli_args.today, budget)
+    tree = Tree(
+        f"[bold underline]Plan for today[/bold underline] ({cli_args.today}): "
+        f"{minutes_str(result.minutes)} of {minutes_str(budget)}"
+    )
+    add_tasks_to_tree(cli_args, tree, result.tasks)
+    console.print("")
+    console.print(tree)
+    console.print("")
+    if len(result.unestimated) > 0:
+        task_ids = ", ".join(str(i) for i, _ in result.unestimated)
+        console.print(
+            f"[yellow]{len(result.unestimated)} tasks have no estimate (add e.g. \\[e:1h]): {task_ids}[/yellow]",
+            highlight=False,
+        )
+        console.print("")
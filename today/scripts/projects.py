@@ -0,0 +1,36 @@
+import argparse
+
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+from today.cli import add_common_args, parse_args
+from today.projects import project_histograms, rollup
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today projects")
+    add_common_args(parser)
+    cli_args = parse_args(parser, args)
+
+    table = Table(title=f"Projects on {cli_args.today}")
+    table.add_column("Project")
+    table.add_column("Open", justify="right")
+    table.add_column("Overdue", justify="right")
+    table.add_column("Due this week", justify="right")
+    table.add_column("Done (30 days)", justify="right")
+    for task_dir in cli_args.task_dirs():
+        for row in rollup(project_histograms(task_dir, cli_args.today), cli_args.today):
+            counts = row.counts
+            if row.heading is None:
+                name = f"[bold]{escape(cli_args.display_path(task_dir / row.file))}[/bold]"
+            else:
+                name = f"  {escape(row.heading)}"
+            overdue = f"[red]{counts.overdue}[/red]" if counts.overdue > 0 else "0"
+            table.add_row(
+                name, str(counts.open), overdue, str(counts.due_this_week), str(counts.done_recently)
+            )
+    console = Console()
+    console.print("")
+    console.print(table)
+    console.print("")
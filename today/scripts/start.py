@@ -1,30 +1,35 @@
 import sys
 from pathlib import Path
-import subprocess
 
 from today.cli import build_parser, parse_args, parse_task_files
+from today import timelog
+from today.notify import default_notifier
 
 
 def run(args) -> None:
     parser = build_parser()
     cli_args = parse_args(parser, args)
-    task_file = Path("/tmp/task")
+    notifier = default_notifier(Path("/tmp/task"))
 
     if cli_args.task_id is None:
-        task_file.write_text("")
+        timelog.append_record(cli_args.task_dir, timelog.stop_record())
         if sys.platform.startswith("darwin"):
-            task_file.write_text("**No active task** | size=12 md=True")
-            subprocess.run(
-                "open -g swiftbar://refreshplugin?name=today.1m.sh", shell=True
-            )
+            notifier.notify("**No active task** | size=12 md=True")
+        else:
+            notifier.notify("")
         sys.exit(0)
 
-    tasks = parse_task_files(cli_args)
+    try:
+        tasks = parse_task_files(cli_args)
+    except ValueError as e:  # e.g. a revision given with --at that doesn't exist
+        print(e)
+        sys.exit(1)
 
     if sys.platform.startswith("darwin"):
         task_snippet: str
         if isinstance(cli_args.task_id, str):
             task_snippet = f"**DO IT**: {cli_args.task_id} | size=12 length=50 md=True"
+            timelog.append_record(cli_args.task_dir, timelog.adhoc_record(cli_args.task_id))
         else:
             if int(cli_args.task_id) >= len(tasks):
                 print(
@@ -33,8 +38,8 @@ def run(args) -> None:
                 sys.exit(1)
             task = tasks[int(cli_args.task_id)]
             task_snippet = f"**NOW**: {task.title} | size=12 length=50 md=True"
-        Path("/tmp/task").write_text(task_snippet)
-        subprocess.run("open -g swiftbar://refreshplugin?name=today.1m.sh", shell=True)
+            timelog.append_record(cli_args.task_dir, timelog.task_record(task, cli_args.display_path(task.file_path), cli_args.file_identity(task.file_path)))
+        notifier.notify(task_snippet)
         sys.exit(0)
 
     else:
@@ -42,6 +47,7 @@ def run(args) -> None:
         if isinstance(cli_args.task_id, str):
             # This is an ad-hoc task that doesn't correspond to any task file, just display the string
             task_snippet = f"<span color='white' weight='bold'>Ad-hoc task:</span> <span color='lightgrey'>{cli_args.task_id}</span>"
+            timelog.append_record(cli_args.task_dir, timelog.adhoc_record(cli_args.task_id))
         else:
             if cli_args.task_id >= len(tasks):
                 print(
@@ -53,12 +59,10 @@ def run(args) -> None:
             # path = " / ".join(task.path)
             path = " <span weight='bold'>/</span> ".join(task.path)
             # current_task = f"<span weight='bold'> Current Task ({cli_args.task_id}) -</span>" if False else ""
-            rel_path = task.file_path.relative_to(cli_args.task_dir)
+            rel_path = cli_args.display_path(task.file_path)
             task_snippet = f"<span color='white'> {path} <span weight='bold' color='red'>→</span> {task.title} <span color='lightgray'>({rel_path}:{task.line_number})</span></span>"
-        Path("/tmp/task").write_text(task_snippet)
-
-        # https://i3wm.org/docs/i3status.html
-        subprocess.run("killall -USR1 i3status", shell=True)
+            timelog.append_record(cli_args.task_dir, timelog.task_record(task, cli_args.display_path(task.file_path), cli_args.file_identity(task.file_path)))
+        notifier.notify(task_snippet)
         sys.exit(0)
 
 
@@ -0,0 +1,23 @@
+import argparse
+import sys
+
+from rich.console import Console
+
+from today.cli import add_common_args, parse_args, parse_task_files, team_to_tree
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today team")
+    add_common_args(parser)
+    cli_args = parse_args(parser, args)
+    console = Console()
+
+    try:
+        tasks = parse_task_files(cli_args)
+        tree = team_to_tree(cli_args, tasks)
+        console.print("")
+        console.print(tree)
+        console.print("")
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        sys.exit(1)
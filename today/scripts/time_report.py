@@ -0,0 +1,58 @@
+import argparse
+from datetime import timedelta
+from typing import List
+
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+from today.cli import add_common_args, args_from_namespace, parse_date
+from today import timelog
+
+
+def run(args) -> None:
+    parser = argparse.ArgumentParser(prog="today time")
+    add_common_args(parser)
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=str,
+        required=False,
+        help="First day of the report, e.g. --from 3/1/2022 (default: 6 days before today)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="end",
+        type=str,
+        required=False,
+        help="Last day of the report, e.g. --to 3/7/2022 (default: today)",
+    )
+    parser.add_argument(
+        "--by",
+        choices=timelog.group_choices,
+        default="task",
+        help="Sum the time spent per task, heading, or task file",
+    )
+    ns = parser.parse_args(args)
+    cli_args = args_from_namespace(ns)
+    end = parse_date(ns.end) if ns.end else cli_args.today
+    start = parse_date(ns.start) if ns.start else end - timedelta(days=6)
+
+    warnings: List[str] = []
+    summary = timelog.update_summary(cli_args.task_dir, warnings)
+    totals = timelog.aggregate(summary, start, end, ns.by)
+
+    table = Table(title=f"Time spent from {start} to {end}")
+    table.add_column(ns.by.capitalize())
+    table.add_column("Time", justify="right")
+    for name, seconds in totals:
+        table.add_row(name, timelog.duration(seconds))
+    table.add_row("[bold]Total[/bold]", f"[bold]{timelog.duration(sum(s for _, s in totals))}[/bold]")
+    console = Console()
+    console.print("")
+    console.print(table)
+    console.print("")
+    for warning in warnings:
+        console.print(f"[yellow]Warning: {escape(warning)}[/yellow]", highlight=False)
+    if len(warnings) > 0:
+        console.print("")
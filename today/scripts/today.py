@@ -1,42 +1,183 @@
 import sys
+import importlib
+from typing import List, Optional
 
 from rich.console import Console
+from rich.markup import escape
 
 from today.cli import (
+    CliArgs,
     build_parser,
-    parse_args,
+    args_from_namespace,
     parse_task_files,
     display_specific_task,
     tasks_to_tree,
+    tree_page,
+    format_diagnostic,
 )
+from today.parser import Diagnostic
+from today.task import Task
+from today import output_cache
+from today.completion import write_listing
+
+# Subcommands of 'today' (e.g. 'today agenda') and the modules that implement them
+# Each module has a run(args) function that takes the arguments after the subcommand name
+subcommands = {
+    "agenda": "today.scripts.agenda",
+    "completion": "today.scripts.completion",
+    "lint": "today.scripts.lint",
+    "plan": "today.scripts.plan",
+    "projects": "today.scripts.projects",
+    "team": "today.scripts.team",
+    "export": "today.scripts.export",
+    "index": "today.scripts.index",
+    "time": "today.scripts.time_report",
+}
 
 
 def run(args) -> None:
+    if len(args) > 0 and args[0] in subcommands:
+        return importlib.import_module(subcommands[args[0]]).run(args[1:])
+
     parser = build_parser()
-    cli_args = parse_args(parser, args)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep the task list on screen and update it when task files change",
+    )
+    parser.add_argument(
+        "--cache-output",
+        action="store_true",
+        help="Reuse the previous output if no task file has changed (e.g. for status bars that run today every minute)",
+    )
+    parser.add_argument(
+        "--page",
+        type=int,
+        required=False,
+        help="Only render this page of the task tree (starting at 1), for very long listings",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        required=False,
+        help="The number of rows (headings, tasks and subtasks) per page (default: the terminal height)",
+    )
+    ns = parser.parse_args(args)
+    cli_args = args_from_namespace(ns)
     console = Console()
+    page: Optional[int] = ns.page if ns.page is not None or ns.page_size is None else 1
+    # Leave room for the title, the blank lines and the page footer
+    page_size: int = ns.page_size if ns.page_size is not None else max(console.height - 5, 1)
+    if (page is not None and page < 1) or page_size < 1:
+        parser.error("--page and --page-size must be at least 1")
+
+    if ns.watch:
+        from today.watch import watch
+
+        # Without --today, follow the date when it changes at midnight
+        watch(cli_args, console, follow_date=ns.today is None)
+        sys.exit(0)
 
-    # TODO: cache task parsing for each markdown file based on file hash
-    tasks = parse_task_files(cli_args)
+    # Revisions given with --at can move (e.g. HEAD), so their output isn't cached
+    if ns.cache_output and cli_args.at_rev is None:
+        options = [
+            *[str(d) for d in cli_args.task_dirs()],
+            str(cli_args.lookahead_days.days),
+            str(cli_args.task_id),
+            str(cli_args.use_index),
+            str(cli_args.assignee),
+            str(console.width),
+            str(console.color_system),
+            str(page),
+            str(page_size),
+        ]
+        path = output_cache.output_path(cli_args.task_dir, options)
+        key = output_cache.fingerprint(cli_args.task_dirs(), cli_args.today, options)
+        output = output_cache.load(path, key)
+        if output is not None:
+            sys.stdout.write(output)
+            sys.exit(0)
+        with console.capture() as capture:
+            status = print_tasks(cli_args, console, page, page_size)
+        output = capture.get()
+        sys.stdout.write(output)
+        if status == 0:
+            output_cache.store(path, key, output)
+        sys.exit(status)
 
-    # If a specific task is displayed, the program will exit
+    sys.exit(print_tasks(cli_args, console, page, page_size))
+
+
+# Print the task tree (or the task given by its task id), returns the exit status
+# With a [page], only the rows of that page of the task tree are rendered
+def print_tasks(cli_args: CliArgs, console: Console, page: Optional[int] = None, page_size: int = 0) -> int:
+    diagnostics: List[Diagnostic] = []
+    try:
+        tasks = parse_task_files(cli_args, diagnostics=diagnostics)
+    except ValueError as e:  # e.g. a revision given with --at that doesn't exist
+        console.print(f"[red]{escape(str(e))}[/red]")
+        return 1
+
+    # If a specific task is displayed, only that task is printed
     if cli_args.task_id is not None:
         assert isinstance(cli_args.task_id, int)
         if cli_args.task_id < 0 or cli_args.task_id >= len(tasks):
-            console.print(f"The task_id {args.task_id} does not exist")
-            sys.exit(1)
+            console.print(f"The task_id {cli_args.task_id} does not exist")
+            return 1
         task = tasks[cli_args.task_id]
         display_specific_task(task, cli_args.today, console)
-        sys.exit(0)
+        return 0
 
+    # Remember the task ids for shell completion ('today-complete')
     try:
-        tree = tasks_to_tree(cli_args, tasks)
-        console.print("")
-        console.print(tree)
-        console.print("")
+        write_listing(
+            cli_args.task_dirs(),
+            cli_args.today,
+            cli_args.lookahead_days.days,
+            cli_args.at_rev,
+            cli_args.assignee,
+            [(task.title, " / ".join(task.path)) for task in tasks],
+        )
+    except OSError:  # e.g. a read-only task directory
+        pass
+
+    try:
+        if page is None:
+            tree = tasks_to_tree(cli_args, tasks)
+            console.print("")
+            console.print(tree)
+            console.print("")
+        elif print_page(cli_args, console, tasks, page, page_size) != 0:
+            return 1
     except ValueError as e:
         console.print(f"[red]{str(e)}[/red]")
-        sys.exit(1)
+        return 1
+
+    # Problems in the task files are skipped over, point them out after the task tree
+    for diagnostic in diagnostics:
+        console.print(f"[yellow]Warning: {escape(format_diagnostic(cli_args, diagnostic))}[/yellow]", highlight=False)
+    if len(diagnostics) > 0:
+        console.print("")
+    return 0
+
+
+# The page is printed as soon as its rows are known, the rows after it are only counted for the footer
+def print_page(cli_args: CliArgs, console: Console, tasks: List[Task], page: int, page_size: int) -> int:
+    result = tree_page(cli_args, tasks, (page - 1) * page_size, page_size)
+    if result.count == 0 and page > 1:
+        rows = result.start
+        console.print(f"The page {page} does not exist (there are {max((rows + page_size - 1) // page_size, 1)} pages)")
+        return 1
+    console.print("")
+    console.print(result.tree)
+    console.print("")
+    if result.count > 0:
+        rows = result.start + result.count + sum(1 for _ in result.rest)
+        pages = (rows + page_size - 1) // page_size
+        first, last = result.start + 1, result.start + result.count
+        console.print(f"[dim]Page {page} of {pages} (rows {first}-{last} of {rows})[/dim]", highlight=False)
+        console.print("")
+    return 0
 
 
 def main():
@@ -0,0 +1,369 @@
+import mmap
+import struct
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from today.task import (
+    AssignmentAttribute,
+    DateAttribute,
+    EstimateAttribute,
+    PriorityAttribute,
+    Task,
+    TaskAttributes,
+)
+from today.parser import Diagnostic, iter_task_files, parse_task_file, uses_today_shorthand
+from today.cache import cache_dir, atomic_write_bytes
+
+# A compact binary snapshot of every task file in [task_dir], written by 'today index build' to
+# [task_dir]/.today/index.snapshot. The listing memory-maps it and reads the task records in place,
+# so a cold 'today' opens one file instead of parsing every task file. Files whose stat() differs from
+# the snapshot's manifest (and new files) are parsed as usual and take the place of their snapshot records.
+#
+# Layout (little-endian): a header with the offset of each section, then
+# - the string table: (strings + 1) u32 offsets into a blob of UTF-8 strings
+# - the heading path table: (paths + 1) u32 offsets into a list of u32 string ids
+# - the file manifest: one file_record per task file
+# - the task records: one task_record per task, each task followed by its subtasks (depth-first)
+# - the diagnostics: one diagnostic_record per problem found when parsing
+
+magic = b"TODAYSN2"
+header = struct.Struct("<8si7I")  # magic, built on (date ordinal), section offsets
+# path, mtime_ns, size, first task, task count, first diagnostic, diagnostic count, uses [d:t]
+file_record = struct.Struct("<IqqIIIIB")
+# file, heading path, title, description, line number, end of subtree, parent (-1 for top-level tasks),
+# created/due/reminder/finished dates and agenda date (date ordinals, 0 for none),
+# assignee (-1 for none), estimate (-1 for none), priority, flags (task_done, has_priority)
+task_record = struct.Struct("<IIIIIIi5iiiiB")
+task_done = 1
+has_priority = 2
+diagnostic_record = struct.Struct("<III")  # file, line number, message
+u32 = struct.Struct("<I")
+
+
+def snapshot_path(task_dir: Path) -> Path:
+    return cache_dir(task_dir) / "index.snapshot"
+
+
+def ordinal(d: Optional[date]) -> int:
+    return d.toordinal() if d else 0
+
+
+def from_ordinal(o: int) -> Optional[date]:
+    return date.fromordinal(o) if o != 0 else None
+
+
+class SnapshotWriter:
+    def __init__(self) -> None:
+        self.strings: Dict[str, int] = {}
+        self.paths: Dict[Tuple[str, ...], int] = {}
+        self.files: List[bytes] = []
+        self.tasks: List[bytes] = []
+        self.diagnostics: List[bytes] = []
+
+    def string(self, s: str) -> int:
+        return self.strings.setdefault(s, len(self.strings))
+
+    def path(self, path: List[str]) -> int:
+        key = tuple(path)
+        if key not in self.paths:
+            for s in key:
+                self.string(s)
+            self.paths[key] = len(self.paths)
+        return self.paths[key]
+
+    def add_task(self, file_index: int, task: Task, parent: int) -> None:
+        index = len(self.tasks)
+        self.tasks.append(b"")  # filled in once the end of the subtree is known
+        for subtask in task.subtasks:
+            self.add_task(file_index, subtask, index)
+        attrs = task.attrs
+        dates = attrs.date_attr
+        self.tasks[index] = task_record.pack(
+            file_index,
+            self.path(task.path),
+            self.string(task.title),
+            self.string(task.description),
+            task.line_number,
+            len(self.tasks),
+            parent,
+            ordinal(dates.created_date),
+            ordinal(dates.due_date),
+            ordinal(dates.reminder_date),
+            ordinal(dates.finished_date),
+            ordinal(task.agenda_date()),
+            self.string(attrs.assn_attr.assigned_to) if attrs.assn_attr else -1,
+            attrs.estimate_attr.minutes if attrs.estimate_attr else -1,
+            attrs.priority_attr.priority if attrs.priority_attr else 0,
+            (task_done if task.done else 0) | (has_priority if attrs.priority_attr else 0),
+        )
+
+    def add_file(
+        self,
+        rel_path: str,
+        stat_key: Tuple[int, int],
+        uses_today: bool,
+        tasks: List[Task],
+        diagnostics: List[Diagnostic],
+    ) -> None:
+        file_index = len(self.files)
+        first_task = len(self.tasks)
+        for task in tasks:
+            self.add_task(file_index, task, -1)
+        first_diagnostic = len(self.diagnostics)
+        for d in diagnostics:
+            self.diagnostics.append(diagnostic_record.pack(file_index, d.line_number, self.string(d.message)))
+        self.files.append(
+            file_record.pack(
+                self.string(rel_path),
+                stat_key[0],
+                stat_key[1],
+                first_task,
+                len(self.tasks) - first_task,
+                first_diagnostic,
+                len(self.diagnostics) - first_diagnostic,
+                int(uses_today),
+            )
+        )
+
+    def to_bytes(self, built_on: date) -> bytes:
+        blob = [s.encode() for s in self.strings]
+        string_offsets = [0]
+        for b in blob:
+            string_offsets.append(string_offsets[-1] + len(b))
+        path_offsets = [0]
+        path_items: List[int] = []
+        for path in self.paths:
+            path_items.extend(self.strings[s] for s in path)
+            path_offsets.append(len(path_items))
+
+        sections = [
+            b"".join(u32.pack(o) for o in string_offsets),
+            b"".join(blob),
+            b"".join(u32.pack(o) for o in path_offsets),
+            b"".join(u32.pack(i) for i in path_items),
+            b"".join(self.files),
+            b"".join(self.tasks),
+            b"".join(self.diagnostics),
+        ]
+        offsets = []
+        offset = header.size
+        for section in sections:
+            offsets.append(offset)
+            offset += len(section)
+        return header.pack(magic, built_on.toordinal(), *offsets) + b"".join(sections)
+
+
+# Parse every task file under [task_dir] into a new snapshot, returns the number of files and tasks
+def build_snapshot(task_dir: Path, today: date) -> Tuple[int, int]:
+    writer = SnapshotWriter()
+    for file in sorted(iter_task_files(task_dir)):
+        stat = file.stat()
+        text = file.read_text()
+        diagnostics: List[Diagnostic] = []
+        tasks = parse_task_file(file, today, text=text, diagnostics=diagnostics)
+        rel_path = file.relative_to(task_dir).as_posix()
+        writer.add_file(rel_path, (stat.st_mtime_ns, stat.st_size), uses_today_shorthand(text), tasks, diagnostics)
+    atomic_write_bytes(snapshot_path(task_dir), writer.to_bytes(today))
+    return len(writer.files), len(writer.tasks)
+
+
+@dataclass
+class SnapshotFile:
+    path: str
+    mtime_ns: int
+    size: int
+    first_task: int
+    task_count: int
+    first_diagnostic: int
+    diagnostic_count: int
+    uses_today: bool
+
+
+# A memory-mapped snapshot, records are only decoded when they are read
+class Snapshot:
+    def __init__(self, task_dir: Path, buffer: mmap.mmap) -> None:
+        self.task_dir = task_dir
+        self.buffer = buffer
+        (
+            _,
+            built_on,
+            self.string_offsets_at,
+            self.strings_at,
+            self.path_offsets_at,
+            self.path_items_at,
+            self.files_at,
+            self.tasks_at,
+            self.diagnostics_at,
+        ) = header.unpack_from(buffer, 0)
+        # Every section must be within the file, in order, and hold whole records
+        sections = [
+            self.string_offsets_at,
+            self.strings_at,
+            self.path_offsets_at,
+            self.path_items_at,
+            self.files_at,
+            self.tasks_at,
+            self.diagnostics_at,
+            len(buffer),
+        ]
+        if (
+            sections[0] != header.size
+            or sections != sorted(sections)
+            or (self.tasks_at - self.files_at) % file_record.size != 0
+            or (self.diagnostics_at - self.tasks_at) % task_record.size != 0
+            or (len(buffer) - self.diagnostics_at) % diagnostic_record.size != 0
+        ):
+            raise ValueError("Corrupt snapshot")
+        self.built_on = date.fromordinal(built_on)
+        self.file_count = (self.tasks_at - self.files_at) // file_record.size
+        self.task_count = (self.diagnostics_at - self.tasks_at) // task_record.size
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def string(self, i: int) -> str:
+        start, end = struct.unpack_from("<II", self.buffer, self.string_offsets_at + 4 * i)
+        return self.buffer[self.strings_at + start : self.strings_at + end].decode()
+
+    def path(self, i: int) -> List[str]:
+        start, end = struct.unpack_from("<II", self.buffer, self.path_offsets_at + 4 * i)
+        items = struct.unpack_from(f"<{end - start}I", self.buffer, self.path_items_at + 4 * start)
+        return [self.string(s) for s in items]
+
+    def file(self, i: int) -> SnapshotFile:
+        (path, mtime_ns, size, first_task, task_count, first_diagnostic, diagnostic_count, uses_today) = (
+            file_record.unpack_from(self.buffer, self.files_at + i * file_record.size)
+        )
+        return SnapshotFile(
+            self.string(path),
+            mtime_ns,
+            size,
+            first_task,
+            task_count,
+            first_diagnostic,
+            diagnostic_count,
+            bool(uses_today),
+        )
+
+    def task_fields(self, i: int) -> Tuple:
+        return task_record.unpack_from(self.buffer, self.tasks_at + i * task_record.size)
+
+    # The task at record [i] with its subtasks, and the record after its subtree
+    def load_task(self, i: int, file_path: Path) -> Tuple[Task, int]:
+        (_, path, title, description, line_number, end, _, created, due, reminder, finished, _,
+         assignee, estimate, priority, flags) = self.task_fields(i)
+        task = Task(
+            path=self.path(path),
+            title=self.string(title),
+            done=bool(flags & task_done),
+            description=self.string(description),
+            attrs=TaskAttributes(
+                date_attr=DateAttribute(
+                    created_date=from_ordinal(created),
+                    due_date=from_ordinal(due),
+                    reminder_date=from_ordinal(reminder),
+                    finished_date=from_ordinal(finished),
+                ),
+                assn_attr=AssignmentAttribute(self.string(assignee)) if assignee >= 0 else None,
+                priority_attr=PriorityAttribute(priority) if flags & has_priority else None,
+                estimate_attr=EstimateAttribute(estimate) if estimate >= 0 else None,
+            ),
+            file_path=file_path,
+            line_number=line_number,
+        )
+        j = i + 1
+        while j < end:
+            subtask, j = self.load_task(j, file_path)
+            task.subtasks.append(subtask)
+        return task, end
+
+    # The top-level tasks of snapshot file [f] that are displayed on [date_filter] (and assigned to [assignee])
+    # Only the records of the tasks that are shown are decoded
+    def visible_tasks(self, f: SnapshotFile, date_filter: date, assignee: Optional[str]) -> List[Task]:
+        tasks: List[Task] = []
+        filter_ordinal = date_filter.toordinal()
+        i = f.first_task
+        while i < f.first_task + f.task_count:
+            fields = self.task_fields(i)
+            end, agenda = fields[5], fields[11]
+            if agenda != 0 and agenda <= filter_ordinal:
+                if assignee is None or any(
+                    self.task_fields(j)[12] >= 0 and self.string(self.task_fields(j)[12]) == assignee
+                    for j in range(i, end)
+                ):
+                    tasks.append(self.load_task(i, self.task_dir / f.path)[0])
+            i = end
+        return tasks
+
+    def diagnostics(self, f: SnapshotFile) -> List[Diagnostic]:
+        return [
+            Diagnostic(line_number, self.string(message), self.task_dir / f.path)
+            for _, line_number, message in (
+                diagnostic_record.unpack_from(self.buffer, self.diagnostics_at + i * diagnostic_record.size)
+                for i in range(f.first_diagnostic, f.first_diagnostic + f.diagnostic_count)
+            )
+        ]
+
+
+def open_snapshot(task_dir: Path) -> Optional[Snapshot]:
+    try:
+        with snapshot_path(task_dir).open("rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # no snapshot (or an empty file)
+        return None
+    # A snapshot of another format (or a truncated one) is ignored
+    if buffer[: len(magic)] != magic:
+        buffer.close()
+        return None
+    try:
+        return Snapshot(task_dir, buffer)
+    except (struct.error, ValueError):
+        buffer.close()
+        return None
+
+
+# The top-level tasks under [task_dir] that are displayed on [date_filter], served from the snapshot
+# (or None if there is no usable snapshot, or it was built in another year)
+# Task files that changed since the snapshot was built are parsed, and their problems appended to [diagnostics]
+def visible_tasks(
+    task_dir: Path,
+    today: date,
+    date_filter: date,
+    assignee: Optional[str],
+    diagnostics: List[Diagnostic],
+) -> Optional[List[Task]]:
+    snapshot = open_snapshot(task_dir)
+    if snapshot is None:
+        return None
+    try:
+        # Dates without a year were resolved in the year the snapshot was built
+        if snapshot.built_on.year != today.year:
+            return None
+        manifest = {f.path: f for f in (snapshot.file(i) for i in range(snapshot.file_count))}
+        tasks: List[Task] = []
+        snapshot_diagnostics: List[Diagnostic] = []
+        for file in iter_task_files(task_dir):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:  # deleted after it was listed
+                continue
+            f = manifest.get(file.relative_to(task_dir).as_posix())
+            if (
+                f is not None
+                and (f.mtime_ns, f.size) == (stat.st_mtime_ns, stat.st_size)
+                and not (f.uses_today and snapshot.built_on != today)
+            ):
+                tasks.extend(snapshot.visible_tasks(f, date_filter, assignee))
+                snapshot_diagnostics.extend(snapshot.diagnostics(f))
+            else:
+                for task in parse_task_file(file, today, diagnostics=snapshot_diagnostics):
+                    if task.is_displayed(date_filter) and (assignee is None or assignee in task.assignees()):
+                        tasks.append(task)
+        diagnostics.extend(snapshot_diagnostics)
+        return tasks
+    except (struct.error, ValueError, IndexError, OverflowError):  # records that point outside of the snapshot
+        return None
+    finally:
+        snapshot.close()
@@ -1,4 +1,4 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Iterable, Tuple
 from dataclasses import dataclass, field
 from datetime import date, timedelta
 from pathlib import Path
@@ -23,6 +23,14 @@ def days(days: timedelta) -> str:
         return f"{days.days} days"
 
 
+# A number of minutes in the same format as estimates (e.g. 1h30m)
+def minutes_str(minutes: int) -> str:
+    hours, minutes = divmod(minutes, 60)
+    if hours == 0:
+        return f"{minutes}m"
+    return f"{hours}h" if minutes == 0 else f"{hours}h{minutes}m"
+
+
 @dataclass
 class Heading:
     level: int
@@ -52,6 +60,12 @@ class DateAttribute:
         else:
             return False
 
+    # The first day on which these dates make a task visible (None if they never will)
+    def earliest_date(self) -> Optional[date]:
+        if self.due_date and self.reminder_date:
+            return min(self.due_date, self.reminder_date)
+        return self.due_date or self.reminder_date
+
     # If this is a subtask and we have the attributes of the parent task,
     # propagate the parent attributes into the subtask
     def merge_attributes(self, parent_attrs: "DateAttribute") -> None:
@@ -74,7 +88,9 @@ class DateAttribute:
                 self.reminder_date, today, prefix="Reminder "
             )
 
-        if self.reminder_date and not self.due_date:  # Reminder only
+        if not self.reminder_date and not self.due_date:  # No dates (e.g. a parent of dated subtasks)
+            return ""
+        elif self.reminder_date and not self.due_date:  # Reminder only
             assert reminder_msg
             return f"[{reminder_msg}]"
         elif self.due_date and not self.reminder_date:  # Due date only
@@ -111,18 +127,30 @@ class PriorityAttribute:
         return f"[***Priority*** = {self.priority}]"
 
 
+@dataclass
+class EstimateAttribute:
+    # How long the task is expected to take
+    minutes: int
+
+    def summary(self) -> str:
+        return minutes_str(self.minutes)
+
+
 @dataclass
 class TaskAttributes:
     date_attr: DateAttribute = field(default_factory=lambda: DateAttribute())
     assn_attr: Optional[AssignmentAttribute] = None
     priority_attr: Optional[PriorityAttribute] = None
+    estimate_attr: Optional[EstimateAttribute] = None
 
     def is_visible(self, today: date, lookahead_days: int) -> bool:
         raise NotImplementedError()
 
+    # Subtasks inherit the dates and assignee of their parent task (priorities and estimates are their own)
     def merge_attributes(self, parent_attrs: "TaskAttributes") -> None:
-        # TODO: are there other attributes to merge? (priority or assignment)
         self.date_attr.merge_attributes(parent_attrs.date_attr)
+        if self.assn_attr is None:
+            self.assn_attr = parent_attrs.assn_attr
 
 
 @dataclass
@@ -135,31 +163,50 @@ class Task:
     attrs: TaskAttributes = field(default_factory=lambda: TaskAttributes())
     file_path: Path = Path.cwd()
     line_number: int = 0
+    # Memoized results of is_displayed(), tasks shouldn't be mutated after parsing
+    _displayed: Dict[Tuple[date, int], bool] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     # A task should be displayed if it has a reminder or due date that is today or has passed
     # If a task is already done then it should not be displayed no matter what
     def is_displayed(self, today: date, lookahead_days: int = 0) -> bool:
-        task_visible = self.attrs.date_attr.is_visible(today, lookahead_days)
-        subtasks_visible = any(
-            [t.is_displayed(today, lookahead_days) for t in self.subtasks]
-        )
-        return (task_visible or subtasks_visible) and not self.done
+        key = (today, lookahead_days)
+        displayed = self._displayed.get(key)
+        if displayed is None:
+            if self.done:
+                displayed = False
+            else:
+                # Evaluate every subtask (bottom-up) so the visibility of the whole subtask tree
+                # is memoized by the time the subtasks are rendered
+                subtasks_displayed = [
+                    t.is_displayed(today, lookahead_days) for t in self.subtasks
+                ]
+                displayed = self.attrs.date_attr.is_visible(
+                    today, lookahead_days
+                ) or any(subtasks_displayed)
+            self._displayed[key] = displayed
+        return displayed
+
+    # The first day on which this task is displayed, taking its subtasks into account
+    # task.is_displayed(d) is True exactly when task.agenda_date() <= d
+    def agenda_date(self) -> Optional[date]:
+        if self.done:
+            return None
+        candidates = [self.attrs.date_attr.earliest_date()] + [
+            t.agenda_date() for t in self.subtasks
+        ]
+        dates = [d for d in candidates if d is not None]
+        return min(dates) if len(dates) > 0 else None
+
+    # Everyone this task or any of its subtasks is assigned to
+    def assignees(self) -> List[str]:
+        names = {self.attrs.assn_attr.assigned_to} if self.attrs.assn_attr else set()
+        for subtask in self.subtasks:
+            names.update(subtask.assignees())
+        return sorted(names)
 
     def summary(self, today: date) -> str:  # Returns a Markdown string
-        # Validate that if this task has no dates but has subtasks with dates, we should error
-        has_no_dates = not self.attrs.date_attr.due_date and not self.attrs.date_attr.reminder_date
-        if has_no_dates and len(self.subtasks) > 0:
-            # Check if any subtask has dates
-            for subtask in self.subtasks:
-                if subtask.attrs.date_attr.due_date or subtask.attrs.date_attr.reminder_date:
-                    raise ValueError(
-                        f"\nError: Subtask has a due date or reminder date, but parent task does not.\n"
-                        f"Parent task: '{self.title}'\n"
-                        f"File: {self.file_path}\n"
-                        f"Line: {self.line_number}\n\n"
-                        f"Please add a due date or reminder date to the parent task, or remove dates from its subtasks."
-                    )
-
         date_summary = self.attrs.date_attr.summary(today)
         # pri_summary = (
         #     (self.attrs.priority_attr.summary() + " ")
@@ -175,12 +222,26 @@ class Task:
         string = ""
         string += f"**Title**: {self.title} \n"
         string += self.attrs.date_attr.details(today)
+        if self.attrs.assn_attr:
+            string += f"**Assigned to**: {self.attrs.assn_attr.assigned_to}  \n"
+        if self.attrs.estimate_attr:
+            string += f"**Estimate**: {self.attrs.estimate_attr.summary()}  \n"
         if len(self.description) > 0:
             string += "**Description**:  \n\n"
             string += self.description
         return string
 
 
+# An inverted index from each assignee to the tasks assigned to them (directly or through a subtask),
+# in the order of [tasks]
+def assignee_index(tasks: Iterable[Task]) -> Dict[str, List[Task]]:
+    index: Dict[str, List[Task]] = {}
+    for task in tasks:
+        for name in task.assignees():
+            index.setdefault(name, []).append(task)
+    return index
+
+
 # sort by:
 # 0. task priority
 # 1. heading path
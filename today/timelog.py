@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from today.task import Task
+from today.cache import cache_dir, atomic_write_text
+
+# An append-only log of the tasks started with 'start', kept in [task_dir]/.today-time.log
+# The log is the only record of the time spent on tasks, so it isn't kept in the (disposable) cache directory
+# Each line is a tab-separated record: <unix timestamp> <task fingerprint> <file> <heading path> <title>
+# A task is worked on from its record until the next record; 'start' without a task id appends a
+# record with the fingerprint '-' which stops the clock.
+# Time is summed per day and per task into a checkpoint ([task_dir]/.today/time.checkpoint.json)
+# which remembers how far into the log it has read, so reports only scan the records added since.
+
+stop_fingerprint = "-"
+
+
+def log_path(task_dir: Path) -> Path:
+    return task_dir / ".today-time.log"
+
+
+# Older versions kept the log in the cache directory, move it next to the task files
+def migrate_log(task_dir: Path) -> None:
+    old_path = cache_dir(task_dir) / "time.log"
+    if old_path.exists() and not log_path(task_dir).exists():
+        os.replace(old_path, log_path(task_dir))
+
+
+def checkpoint_path(task_dir: Path) -> Path:
+    return cache_dir(task_dir) / "time.checkpoint.json"
+
+
+# A fingerprint that identifies a task across runs, even as task ids and line numbers change
+def task_fingerprint(file: str, heading: str, title: str) -> str:
+    return hashlib.sha1(f"{file}\0{heading}\0{title}".encode()).hexdigest()[:16]
+
+
+@dataclass
+class TimeRecord:
+    timestamp: int
+    fingerprint: str
+    file: str = ""
+    heading: str = ""
+    title: str = ""
+
+    def to_line(self) -> str:
+        fields = [str(self.timestamp), self.fingerprint, self.file, self.heading, self.title]
+        return "\t".join(f.replace("\t", " ").replace("\n", " ") for f in fields) + "\n"
+
+    # Raises ValueError if [line] isn't a record
+    @staticmethod
+    def from_line(line: str) -> "TimeRecord":
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 2 or len(fields[1]) == 0:
+            raise ValueError(f"Not a time log record: {line!r}")
+        fields += [""] * (5 - len(fields))
+        return TimeRecord(int(fields[0]), fields[1], fields[2], fields[3], fields[4])
+
+
+# The file part of a task fingerprint: the label of its task directory (see cli.root_labels) and its path
+# relative to that directory. Unlike the displayed path, it doesn't change when other task directories are
+# added, and unlike an absolute path, it doesn't change when the task directory is moved (or synced elsewhere).
+def file_identity(root_label: str, rel_path: str) -> str:
+    return f"{root_label}\0{rel_path}"
+
+
+# [file] is the task's file as displayed by 'today', [identity] is its file_identity
+def task_record(task: Task, file: str, identity: str, timestamp: Optional[int] = None) -> TimeRecord:
+    heading = " / ".join(task.path)
+    return TimeRecord(
+        timestamp=int(time.time()) if timestamp is None else timestamp,
+        fingerprint=task_fingerprint(identity, heading, task.title),
+        file=file,
+        heading=heading,
+        title=task.title,
+    )
+
+
+# A task that doesn't live in any task file (e.g. 'start "ad-hoc task"')
+def adhoc_record(title: str, timestamp: Optional[int] = None) -> TimeRecord:
+    return TimeRecord(
+        timestamp=int(time.time()) if timestamp is None else timestamp,
+        fingerprint=task_fingerprint("", "", title),
+        title=title,
+    )
+
+
+def stop_record(timestamp: Optional[int] = None) -> TimeRecord:
+    return TimeRecord(
+        timestamp=int(time.time()) if timestamp is None else timestamp,
+        fingerprint=stop_fingerprint,
+    )
+
+
+# Each record is a single small write to a file opened in append mode, so concurrent
+# 'start' calls can't interleave partial records
+def append_record(task_dir: Path, record: TimeRecord) -> None:
+    migrate_log(task_dir)
+    with log_path(task_dir).open("a") as f:
+        f.write(record.to_line())
+
+
+@dataclass
+class TimeSummary:
+    # How many bytes of the log have been folded into this summary
+    offset: int = 0
+    # The task currently being worked on (the last record, unless it stopped the clock)
+    open_record: Optional[TimeRecord] = None
+    # fingerprint -> (file, heading, title)
+    tasks: Dict[str, Tuple[str, str, str]] = field(default_factory=dict)
+    # ISO date -> fingerprint -> seconds
+    days: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    # Attribute the time between [start] and [end] to [fingerprint], split at midnights
+    def add_interval(self, fingerprint: str, start: int, end: int) -> None:
+        while start < end:
+            start_dt = datetime.fromtimestamp(start)
+            next_midnight = datetime.combine(start_dt.date() + timedelta(days=1), datetime.min.time())
+            chunk_end = min(end, int(next_midnight.timestamp()))
+            day = self.days.setdefault(start_dt.date().isoformat(), {})
+            day[fingerprint] = day.get(fingerprint, 0) + (chunk_end - start)
+            start = chunk_end
+
+    def add_record(self, record: TimeRecord) -> None:
+        if self.open_record is not None:
+            self.add_interval(self.open_record.fingerprint, self.open_record.timestamp, record.timestamp)
+        if record.fingerprint == stop_fingerprint:
+            self.open_record = None
+        else:
+            self.tasks[record.fingerprint] = (record.file, record.heading, record.title)
+            self.open_record = record
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "offset": self.offset,
+                "open_record": self.open_record.to_line() if self.open_record else None,
+                "tasks": self.tasks,
+                "days": self.days,
+            }
+        )
+
+    @staticmethod
+    def from_json(s: str) -> "TimeSummary":
+        d = json.loads(s)
+        return TimeSummary(
+            offset=d["offset"],
+            open_record=TimeRecord.from_line(d["open_record"]) if d["open_record"] else None,
+            tasks={k: (v[0], v[1], v[2]) for k, v in d["tasks"].items()},
+            days=d["days"],
+        )
+
+
+# Fold the records appended to the log since the last checkpoint into the summary and save it
+# Malformed records (e.g. from editing the log by hand) are skipped, and appended to [warnings] (if given)
+def update_summary(task_dir: Path, warnings: Optional[List[str]] = None) -> TimeSummary:
+    summary = TimeSummary()
+    try:
+        summary = TimeSummary.from_json(checkpoint_path(task_dir).read_text())
+    except (OSError, ValueError, KeyError):
+        pass
+
+    migrate_log(task_dir)
+    path = log_path(task_dir)
+    if not path.exists():
+        return TimeSummary()
+    if path.stat().st_size < summary.offset:  # The log was truncated or replaced, start over
+        summary = TimeSummary()
+
+    with path.open("rb") as f:
+        f.seek(summary.offset)
+        new_records = f.read()
+    # Only fold in complete lines, a record may be in the middle of being appended
+    complete = new_records[: new_records.rfind(b"\n") + 1]
+    if len(complete) == 0:
+        return summary
+    for line in complete.decode(errors="replace").splitlines():
+        if len(line.strip()) == 0:
+            continue
+        try:
+            record = TimeRecord.from_line(line)
+        except ValueError:
+            if warnings is not None:
+                warnings.append(f"Skipped a malformed record in {path}: {line.strip()}")
+            continue
+        summary.add_record(record)
+    summary.offset += len(complete)
+    atomic_write_text(checkpoint_path(task_dir), summary.to_json())
+    return summary
+
+
+group_choices = ["task", "heading", "file"]
+
+
+# Total seconds spent per task/heading/file between [start] and [end] (inclusive)
+# The task that is currently being worked on is counted up to [now]
+def aggregate(
+    summary: TimeSummary, start: date, end: date, group_by: str, now: Optional[int] = None
+) -> List[Tuple[str, int]]:
+    assert group_by in group_choices
+    days = dict(summary.days)
+    if summary.open_record is not None:
+        open_summary = TimeSummary()
+        open_summary.add_interval(
+            summary.open_record.fingerprint,
+            summary.open_record.timestamp,
+            int(time.time()) if now is None else now,
+        )
+        for day, seconds_by_task in open_summary.days.items():
+            merged = dict(days.get(day, {}))
+            for fingerprint, seconds in seconds_by_task.items():
+                merged[fingerprint] = merged.get(fingerprint, 0) + seconds
+            days[day] = merged
+
+    totals: Dict[str, int] = {}
+    day = start
+    while day <= end:
+        for fingerprint, seconds in days.get(day.isoformat(), {}).items():
+            file, heading, title = summary.tasks.get(fingerprint, ("", "", fingerprint))
+            if group_by == "task":
+                key = " / ".join(s for s in [file, heading, title] if s)
+            elif group_by == "heading":
+                key = " / ".join(s for s in [file, heading] if s) or "(ad-hoc tasks)"
+            else:
+                key = file or "(ad-hoc tasks)"
+            totals[key] = totals.get(key, 0) + seconds
+        day += timedelta(days=1)
+    return sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+def duration(seconds: int) -> str:
+    hours, minutes = divmod(seconds // 60, 60)
+    return f"{hours}h {minutes:02d}m"
@@ -0,0 +1,145 @@
+import importlib.util
+import os
+import threading
+import time
+from dataclasses import replace
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from rich.console import Console, Group, RenderableType
+from rich.live import Live
+from rich.markup import escape
+from rich.text import Text
+
+from today.cli import CliArgs, RenderedSubtree, format_diagnostic, parse_task_files, tasks_to_tree
+from today.task import Task
+from today.parser import Diagnostic, iter_task_files
+from today import api
+
+# watchdog is optional, without it the task files are polled
+have_watchdog: bool = importlib.util.find_spec("watchdog") is not None
+
+# 'today --watch': keep the task tree on screen and update it when task files change
+# Only the changed task files are re-parsed (via an api.ParseCache per task directory) and only the top-level
+# heading subtrees whose tasks changed are re-rendered.
+
+
+# Polls the stat() of every task file
+class PollingWatcher:
+    def __init__(self, task_dirs: Sequence[Path], interval: float) -> None:
+        self.task_dirs = task_dirs
+        self.interval = interval
+        self.snapshot = self.stat_files()
+
+    def stat_files(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot: Dict[Path, Tuple[int, int]] = {}
+        for task_dir in self.task_dirs:
+            for file in iter_task_files(task_dir):
+                try:
+                    stat = file.stat()
+                except OSError:  # the file was deleted during the walk
+                    continue
+                snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    # Returns True once task files have changed and have stopped changing for [debounce] seconds,
+    # or False if nothing changed within [timeout] seconds
+    def wait(self, timeout: float, debounce: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(min(self.interval, max(0.0, deadline - time.monotonic())))
+            snapshot = self.stat_files()
+            if snapshot != self.snapshot:
+                # Editors often write a file several times in a row when saving
+                while True:
+                    self.snapshot = snapshot
+                    time.sleep(debounce)
+                    snapshot = self.stat_files()
+                    if snapshot == self.snapshot:
+                        return True
+        return False
+
+    def stop(self) -> None:
+        pass
+
+
+# Uses filesystem change notifications from watchdog (only if have_watchdog)
+class NotifyingWatcher:
+    def __init__(self, task_dirs: Sequence[Path]) -> None:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEvent, FileSystemEventHandler
+
+        self.changed = threading.Event()
+        changed = self.changed
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event: FileSystemEvent) -> None:
+                paths = [event.src_path, getattr(event, "dest_path", "")]
+                if any(os.fsdecode(p).endswith(".md") for p in paths):
+                    changed.set()
+
+        self.observer = Observer()
+        for task_dir in task_dirs:
+            self.observer.schedule(Handler(), str(task_dir), recursive=True)
+        self.observer.start()
+
+    def wait(self, timeout: float, debounce: float) -> bool:
+        if not self.changed.wait(timeout):
+            return False
+        # Editors often write a file several times in a row when saving
+        while True:
+            self.changed.clear()
+            if not self.changed.wait(debounce):
+                return True
+
+    def stop(self) -> None:
+        self.observer.stop()
+        self.observer.join()
+
+
+def render(
+    args: CliArgs,
+    caches: Dict[Path, api.ParseCache],
+    subtrees: Dict[str, RenderedSubtree],
+) -> RenderableType:
+    try:
+        diagnostics: List[Diagnostic] = []
+        tasks: List[Task] = parse_task_files(args, caches, diagnostics)
+        warnings = [
+            Text(f"Warning: {format_diagnostic(args, d)}", style="yellow") for d in diagnostics
+        ]
+        return Group("", tasks_to_tree(args, tasks, subtrees), "", *warnings)
+    except (ValueError, OSError) as e:  # keep watching, the task file may be fixed on the next save
+        return f"[red]{escape(str(e))}[/red]"
+
+
+# Re-render whenever task files change, or the date changes (if [follow_date] is set, i.e. no --today)
+def watch(
+    args: CliArgs,
+    console: Console,
+    follow_date: bool,
+    interval: float = 1.0,
+    debounce: float = 0.2,
+) -> None:
+    caches: Dict[Path, api.ParseCache] = {}
+    subtrees: Dict[str, RenderedSubtree] = {}
+    watcher = (
+        NotifyingWatcher(args.task_dirs())
+        if have_watchdog
+        else PollingWatcher(args.task_dirs(), interval)
+    )
+    try:
+        with Live(render(args, caches, subtrees), console=console, auto_refresh=False) as live:
+            while True:
+                changed = watcher.wait(interval, debounce)
+                new_today: Optional[date] = date.today() if follow_date else None
+                if new_today is not None and new_today != args.today:
+                    args = replace(args, today=new_today)
+                    changed = True
+                if changed:
+                    live.update(render(args, caches, subtrees), refresh=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()